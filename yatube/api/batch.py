@@ -0,0 +1,75 @@
+"""Посты по списку id для клиентов, собирающих ленту из id.
+
+Все поля поста, уже приведённые к виду ответа, лежат в кэше под
+object:api.post:<id>, а отсутствие поста - в кэше промахов
+posts.lookups под тем же ключом missing:. Запрос читает каждый кэш
+одним get_many, недостающие посты выбирает одним запросом pk__in, а
+затем кладёт их в кэш одним set_many. Записи поста стирают сигналы
+api.signals; переименование автора или группы видно после
+API_BATCH_CACHE_TIMEOUT.
+
+Сигналы стирают запись только в кэше API_BATCH_CACHE_ALIAS. С
+LocMemCache по умолчанию у каждого процесса свой кэш, и другие
+воркеры отдают изменённый или удалённый пост ещё до
+API_BATCH_CACHE_TIMEOUT секунд; для нескольких воркеров алиас должен
+указывать на общий кэш (Redis, Memcached).
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from posts.lookups import missing_key, negative_cache
+from posts.models import Post
+
+from .serializers import POSTS
+
+
+def post_key(post_id):
+    return f'object:api.post:{post_id}'
+
+
+def get_posts(ids):
+    """{id: все поля поста} для найденных id."""
+    cache = caches[settings.API_BATCH_CACHE_ALIAS]
+    keys = {post_key(post_id): post_id for post_id in ids}
+    posts = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    missing_keys = {
+        missing_key(Post, 'pk', post_id): post_id
+        for post_id in ids if post_id not in posts
+    }
+    known_missing = {
+        missing_keys[key]
+        for key, value in negative_cache().get_many(missing_keys).items()
+        if value
+    }
+    wanted = [
+        post_id for post_id in ids
+        if post_id not in posts and post_id not in known_missing
+    ]
+    if not wanted:
+        return posts
+    names = list(POSTS.fields)
+    found = {
+        row['id']: POSTS.serialize(row, names)
+        for row in POSTS.values(
+            POSTS.all().filter(pk__in=wanted), names
+        ).order_by()
+    }
+    posts.update(found)
+    cache.set_many(
+        {post_key(post_id): item for post_id, item in found.items()},
+        settings.API_BATCH_CACHE_TIMEOUT,
+    )
+    negative_cache().set_many(
+        {
+            missing_key(Post, 'pk', post_id): True
+            for post_id in wanted if post_id not in found
+        },
+        settings.NEGATIVE_CACHE_TIMEOUT,
+    )
+    return posts
+
+
+def forget_post(post_id):
+    caches[settings.API_BATCH_CACHE_ALIAS].delete(post_key(post_id))
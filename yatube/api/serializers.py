@@ -0,0 +1,232 @@
+"""Сериализация ресурсов API без создания объектов моделей.
+
+Каждое поле ресурса - путь для QuerySet.values() и функция
+преобразования значения. Запрос выбирает только колонки полей из
+?fields= и соединяет только нужные для них таблицы: author в посте
+добавляет JOIN с пользователями, а id,text обходится без него. Строки
+приходят словарями и сразу превращаются в ответ.
+
+Страницы списков отсчитываются курсором - значениями полей сортировки
+последней отданной строки, - поэтому дальние страницы читаются по
+индексу, а не через OFFSET.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post, User
+
+
+BAD_CURSOR = 'Неверный курсор'
+# Наибольший id: BigAutoField и INTEGER в SQLite
+MAX_ID = 2 ** 63 - 1
+
+
+class InvalidParameter(ValueError):
+    """Неверный параметр запроса; API отвечает 400."""
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Field:
+    __slots__ = ('lookup', 'convert', 'annotation')
+
+    def __init__(self, lookup, convert=None, annotation=None):
+        self.lookup = lookup
+        self.convert = convert
+        self.annotation = annotation
+
+
+class Resource:
+    """Поля ресурса и сортировка его списков.
+
+    ordering - пути values() одного направления, последний уникален.
+    """
+
+    def __init__(self, queryset, fields, ordering, descending=True):
+        self.queryset = queryset
+        self.fields = fields
+        self.ordering = ordering
+        self.descending = descending
+
+    def all(self):
+        return self.queryset.all()
+
+    def field_names(self, param):
+        """Имена из ?fields=id,text или все поля ресурса."""
+        if not param:
+            return list(self.fields)
+        names = [name.strip() for name in param.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidParameter(
+                f'Неизвестные поля: {", ".join(unknown)}; '
+                f'доступны: {", ".join(self.fields)}'
+            )
+        return list(dict.fromkeys(names))
+
+    def values(self, queryset, names):
+        annotations = {
+            name: self.fields[name].annotation for name in names
+            if self.fields[name].annotation is not None
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        lookups = {self.fields[name].lookup for name in names}
+        return queryset.values(*lookups.union(self.ordering))
+
+    def serialize(self, row, names):
+        item = {}
+        for name in names:
+            field = self.fields[name]
+            value = row[field.lookup]
+            item[name] = value if field.convert is None else field.convert(
+                value
+            )
+        return item
+
+    def detail(self, queryset, names):
+        """Один объект или None."""
+        row = self.values(queryset, names).order_by().first()
+        return None if row is None else self.serialize(row, names)
+
+    def page(self, queryset, names, cursor=None, limit=None):
+        """(объекты страницы, курсор следующей страницы или None)."""
+        limit = page_size(limit)
+        direction = '-' if self.descending else ''
+        queryset = self.values(queryset, names).order_by(
+            *(direction + lookup for lookup in self.ordering)
+        )
+        if cursor:
+            queryset = self.after(queryset, decode_cursor(cursor))
+        rows = list(queryset[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(
+                [rows[-1][lookup] for lookup in self.ordering]
+            )
+        return [self.serialize(row, names) for row in rows], next_cursor
+
+    def after(self, queryset, values):
+        """Строки после курсора: (a, b) < (va, vb) развёрнутое в Q."""
+        values = self.cursor_values(queryset.model, values)
+        compare = 'lt' if self.descending else 'gt'
+        condition = Q()
+        for index, lookup in enumerate(self.ordering):
+            equal = dict(zip(self.ordering[:index], values[:index]))
+            condition |= Q(
+                **equal, **{f'{lookup}__{compare}': values[index]}
+            )
+        return queryset.filter(condition)
+
+    def cursor_values(self, model, values):
+        """Значения курсора, приведённые к полям сортировки."""
+        if len(values) != len(self.ordering):
+            raise InvalidParameter(BAD_CURSOR)
+        converted = []
+        for lookup, value in zip(self.ordering, values):
+            if not isinstance(value, (str, int)) or isinstance(value, bool):
+                raise InvalidParameter(BAD_CURSOR)
+            try:
+                value = model._meta.get_field(lookup).to_python(value)
+                if isinstance(value, datetime):
+                    if timezone.is_naive(value):
+                        value = timezone.make_aware(value, timezone.utc)
+                    # 9999-12-31T23:59-05:00 в UTC уже не datetime: база
+                    # приводит значение к UTC и падает с OverflowError.
+                    value = value.astimezone(timezone.utc)
+            except (ValidationError, ValueError, TypeError, OverflowError):
+                raise InvalidParameter(BAD_CURSOR)
+            if not isinstance(value, (datetime, int)) or (
+                    isinstance(value, int) and not 0 <= value <= MAX_ID):
+                raise InvalidParameter(BAD_CURSOR)
+            converted.append(value)
+        return converted
+
+
+def page_size(limit):
+    if limit in (None, ''):
+        return settings.API_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise InvalidParameter('limit должен быть числом')
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    # Время с микросекундами: DjangoJSONEncoder обрезал бы их до
+    # миллисекунд, и строки с той же миллисекундой потерялись бы.
+    values = [
+        value.isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidParameter(BAD_CURSOR)
+    if not isinstance(values, list):
+        raise InvalidParameter(BAD_CURSOR)
+    return values
+
+
+POSTS = Resource(
+    Post.objects,
+    {
+        'id': Field('id'),
+        'text': Field('text'),
+        'pub_date': Field('pub_date'),
+        'author': Field('author__username'),
+        'group': Field('group__slug'),
+        'image': Field('image', image_url),
+    },
+    ordering=('pub_date', 'id'),
+)
+COMMENTS = Resource(
+    Comment.objects,
+    {
+        'id': Field('id'),
+        'post': Field('post_id'),
+        'author': Field('author__username'),
+        'text': Field('text'),
+        'created': Field('created'),
+    },
+    ordering=('created', 'id'),
+)
+GROUPS = Resource(
+    Group.objects,
+    {
+        'id': Field('id'),
+        'title': Field('title'),
+        'slug': Field('slug'),
+        'description': Field('description'),
+    },
+    ordering=('id',),
+    descending=False,
+)
+PROFILES = Resource(
+    User.objects.filter(is_active=True),
+    {
+        'id': Field('id'),
+        'username': Field('username'),
+        'first_name': Field('first_name'),
+        'last_name': Field('last_name'),
+        'posts_count': Field('posts_count', annotation=Count('posts')),
+    },
+    ordering=('id',),
+    descending=False,
+)
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Post
+
+from .batch import forget_post
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def clear_post_cache(sender, instance, **kwargs):
+    """Как posts.signals.clear_lookup_cache: сразу и после коммита."""
+    # После удаления Django обнуляет pk, поэтому запоминаем его.
+    post_id = instance.pk
+    forget_post(post_id)
+    transaction.on_commit(lambda: forget_post(post_id))
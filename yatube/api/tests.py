@@ -0,0 +1,209 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+from .batch import get_posts
+from .serializers import encode_cursor
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {index}',
+                group=cls.group if index % 2 else None,
+            )
+            for index in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_list_cursor_pagination(self):
+        """Курсор проходит все посты по одному разу, новые первыми."""
+        url = reverse('api:v1:post_list') + '?limit=2&fields=id'
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            ids += [post['id'] for post in data['results']]
+            url = data['next']
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fields_skip_joins(self):
+        """В запрос попадают только колонки и JOIN запрошенных полей."""
+        url = reverse('api:v1:post_detail', args=[self.posts[1].pk])
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(url, {'fields': 'id,text'})
+        self.assertEqual(
+            response.json(), {'id': self.posts[1].pk, 'text': 'Пост 1'}
+        )
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+        response = self.client.get(url, {'fields': 'author,group'})
+        self.assertEqual(
+            response.json(), {'author': 'author', 'group': 'group'}
+        )
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_etag(self):
+        url = reverse('api:v1:group_detail', args=['group'])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['title'], 'Группа')
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_nested_lists(self):
+        response = self.client.get(
+            reverse('api:v1:group_posts', args=['group'])
+        )
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(
+            reverse('api:v1:profile_posts', args=['author'])
+        )
+        self.assertEqual(len(response.json()['results']), 5)
+        response = self.client.get(
+            reverse('api:v1:comment_list', args=[self.posts[0].pk])
+        )
+        self.assertEqual(
+            response.json()['results'][0]['text'], 'Комментарий'
+        )
+
+    def test_profile(self):
+        response = self.client.get(
+            reverse('api:v1:profile_detail', args=['author']),
+            {'fields': 'username,posts_count'},
+        )
+        self.assertEqual(
+            response.json(), {'username': 'author', 'posts_count': 5}
+        )
+
+    def test_errors(self):
+        """Ненайденные объекты, неверный курсор и запись отдают JSON."""
+        posts_url = reverse('api:v1:post_list')
+        groups_url = reverse('api:v1:group_list')
+        for url, status in (
+            (reverse('api:v1:profile_detail', args=['ghost']),
+             HTTPStatus.NOT_FOUND),
+            (reverse('api:v1:group_posts', args=['ghost']),
+             HTTPStatus.NOT_FOUND),
+            (reverse('api:v1:post_list') + '?cursor=broken',
+             HTTPStatus.BAD_REQUEST),
+            (reverse('api:v1:post_list') + '?cursor=WyJ4IiwgMV0=',
+             HTTPStatus.BAD_REQUEST),
+            *(
+                (f'{url}?cursor={encode_cursor(values)}',
+                 HTTPStatus.BAD_REQUEST)
+                for url, values in (
+                    (posts_url, ['2020-01-01T00:00:00', 'abc']),
+                    (posts_url, [1, 2]),
+                    (posts_url, [{'a': 1}, 1]),
+                    (posts_url, ['2020-01-01T00:00:00', None]),
+                    (posts_url, ['2020-01-01T00:00:00', 10 ** 30]),
+                    (posts_url, ['2020-01-01T00:00:00']),
+                    (posts_url, ['9999-12-31T23:59:59.999999-05:00', 5]),
+                    (posts_url, ['0001-01-01T00:00:00+05:00', 5]),
+                    (groups_url, ['x']),
+                    (groups_url, [True]),
+                )
+            ),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', response.json())
+        response = self.client.post(reverse('api:v1:post_list'))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+
+class PostBatchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {index}')
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('api:v1:post_batch')
+
+    def test_order_and_missing(self):
+        """Порядок запроса сохраняется, ненайденные id в missing."""
+        first, second, third = (post.pk for post in self.posts)
+        response = self.client.get(
+            self.url,
+            {'ids': f'{third},999,{first},{third}', 'fields': 'id,text'},
+        )
+        self.assertEqual(response.json(), {
+            'results': [
+                {'id': third, 'text': 'Пост 2'},
+                {'id': first, 'text': 'Пост 0'},
+            ],
+            'missing': [999],
+        })
+        response = self.client.get(
+            self.url, {'ids': [f'{first},{second}', '999']}
+        )
+        self.assertEqual(
+            [post['id'] for post in response.json()['results']],
+            [first, second],
+        )
+        self.assertEqual(response.json()['results'][0]['author'], 'author')
+
+    def test_cache_multi_get(self):
+        """Из базы читаются только посты, которых нет в кэше, а
+        известные промахи не читаются вовсе."""
+        first, second, _ = (post.pk for post in self.posts)
+        get_posts([first, 999])
+        with self.assertNumQueries(1) as queries:
+            posts = get_posts([second, first, 999])
+        self.assertIn(str(second), queries.captured_queries[0]['sql'])
+        self.assertNotIn(str(first), queries.captured_queries[0]['sql'])
+        self.assertEqual(list(posts), [first, second])
+        with self.assertNumQueries(0):
+            get_posts([second, 999, first])
+
+    def test_cache_cleared_on_save_and_delete(self):
+        post = Post.objects.create(author=self.author, text='Текст')
+        self.client.get(self.url, {'ids': post.pk})
+        post.text = 'Новый текст'
+        post.save()
+        response = self.client.get(self.url, {'ids': post.pk})
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый текст')
+        post_id = post.pk
+        post.delete()
+        response = self.client.get(self.url, {'ids': post_id})
+        self.assertEqual(response.json()['missing'], [post_id])
+
+    def test_invalid_ids(self):
+        with self.settings(API_BATCH_MAX_IDS=2):
+            for params in (
+                {}, {'ids': 'a,1'}, {'ids': '1,2,3'}, {'ids': '-1'},
+                {'ids': '0'}, {'ids': '99999999999999999999'},
+            ):
+                with self.subTest(params=params):
+                    response = self.client.get(self.url, params)
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.BAD_REQUEST
+                    )
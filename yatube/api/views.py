@@ -0,0 +1,165 @@
+"""JSON API только для чтения, версия v1.
+
+Списки принимают ?fields=, ?limit= и ?cursor= (значение next из
+предыдущего ответа). Ответы несут ETag от тела, и клиент с тем же
+If-None-Match получает 304 без тела.
+"""
+import hashlib
+import json
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from posts.lookups import get_or_404
+from posts.models import Group, Post, User
+
+from .batch import get_posts
+from .serializers import (COMMENTS, GROUPS, MAX_ID, POSTS, PROFILES,
+                          InvalidParameter)
+
+
+def json_response(request, data):
+    body = json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+    etag = quote_etag(hashlib.md5(body).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def api_view(view):
+    """view возвращает данные ответа; ошибки отдаются JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except InvalidParameter as error:
+            return JsonResponse(
+                {'error': str(error)}, status=HTTPStatus.BAD_REQUEST
+            )
+        except Http404 as error:
+            return JsonResponse(
+                {'error': str(error)}, status=HTTPStatus.NOT_FOUND
+            )
+        return json_response(request, data)
+    return wrapper
+
+
+def page(request, resource, queryset):
+    results, cursor = resource.page(
+        queryset,
+        resource.field_names(request.GET.get('fields')),
+        request.GET.get('cursor'),
+        request.GET.get('limit'),
+    )
+    next_url = None
+    if cursor is not None:
+        params = request.GET.copy()
+        params['cursor'] = cursor
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{params.urlencode()}'
+        )
+    return {'results': results, 'next': next_url}
+
+
+def detail(request, resource, queryset):
+    item = resource.detail(
+        queryset, resource.field_names(request.GET.get('fields'))
+    )
+    if item is None:
+        raise Http404('Объект не найден')
+    return item
+
+
+@api_view
+def post_list(request):
+    return page(request, POSTS, POSTS.all())
+
+
+@api_view
+def post_detail(request, post_id):
+    return detail(request, POSTS, POSTS.all().filter(pk=post_id))
+
+
+def batch_ids(request):
+    """id из ?ids=3,1,2 (параметр может повторяться) без повторов, в
+    порядке запроса."""
+    values = [
+        value
+        for param in request.GET.getlist('ids')
+        for value in param.replace(',', ' ').split()
+    ]
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values))
+    except ValueError:
+        raise InvalidParameter('ids должны быть числами')
+    if any(not 1 <= post_id <= MAX_ID for post_id in ids):
+        raise InvalidParameter(f'ids должны быть от 1 до {MAX_ID}')
+    if not ids:
+        raise InvalidParameter('Передайте ids')
+    if len(ids) > settings.API_BATCH_MAX_IDS:
+        raise InvalidParameter(
+            f'Не больше {settings.API_BATCH_MAX_IDS} id за запрос'
+        )
+    return ids
+
+
+@api_view
+def post_batch(request):
+    """Посты в порядке ids; ненайденные id перечислены в missing."""
+    ids = batch_ids(request)
+    names = POSTS.field_names(request.GET.get('fields'))
+    posts = get_posts(ids)
+    return {
+        'results': [
+            {name: posts[post_id][name] for name in names}
+            for post_id in ids if post_id in posts
+        ],
+        'missing': [post_id for post_id in ids if post_id not in posts],
+    }
+
+
+@api_view
+def comment_list(request, post_id):
+    post = get_or_404(Post, pk=post_id)
+    return page(request, COMMENTS, COMMENTS.all().filter(post_id=post.pk))
+
+
+@api_view
+def group_list(request):
+    return page(request, GROUPS, GROUPS.all())
+
+
+@api_view
+def group_detail(request, slug):
+    return detail(request, GROUPS, GROUPS.all().filter(slug=slug))
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_or_404(Group, slug=slug)
+    return page(request, POSTS, POSTS.all().filter(group_id=group.pk))
+
+
+@api_view
+def profile_detail(request, username):
+    return detail(request, PROFILES, PROFILES.all().filter(username=username))
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_or_404(User, username=username)
+    return page(request, POSTS, POSTS.all().filter(author_id=author.pk))
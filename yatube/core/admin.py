@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import OutboxEmail
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'created',
+        'attempts',
+        'next_attempt',
+        'last_error',
+    )
+    list_filter = ('attempts',)
+    exclude = ('message',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals  # noqa: F401
+        if settings.SAMPLING_PROFILER_ENABLED:
+            from .profiling import install_signal_handler
+            install_signal_handler()
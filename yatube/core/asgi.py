@@ -0,0 +1,200 @@
+"""ASGI-приложение поверх синхронного WSGIHandler Django 2.2.
+
+View выполняются в ограниченном пуле потоков, поэтому долгий запрос
+(генерация миниатюры, ожидание блокировки SQLite) не занимает весь
+воркер. Статика и страницы, уже лежащие в кэше cache_page, отдаются
+прямо из цикла событий, без похода в пул. Пути из ASGI_ROUTES
+обслуживают асинхронные обработчики (например, SSE в posts.events).
+
+Ответ WSGI собирается в пуле целиком и только потом отправляется:
+StreamingHttpResponse и FileResponse держатся в памяти до конца, а
+первый байт клиент получает после последнего. Длинные потоки нужно
+отдавать через ASGI_ROUTES, а большие файлы - сервером перед
+приложением.
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.utils.cache import get_cache_key
+from django.utils.module_loading import import_string
+
+from .compression import compress_response
+from .staticfiles import StaticFiles
+
+
+def build_environ(scope, body):
+    """WSGI environ (PEP 3333) из ASGI scope и тела запроса."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+def header_value(scope, name):
+    return b','.join(
+        value for header, value in scope.get('headers', [])
+        if header.lower() == name
+    ).decode('latin-1')
+
+
+def response_headers(response):
+    headers = [
+        (name.encode('latin-1'), value.encode('latin-1'))
+        for name, value in response.items()
+    ]
+    for cookie in response.cookies.values():
+        headers.append(
+            (b'Set-Cookie', cookie.output(header='').strip().encode())
+        )
+    return headers
+
+
+class ASGIHandler:
+    def __init__(self):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi'
+        )
+        self.static = StaticFiles()
+        self.routes = [
+            (prefix, import_string(handler))
+            for prefix, handler in settings.ASGI_ROUTES
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип scope: {scope["type"]}')
+        for prefix, handler in self.routes:
+            if scope['path'].startswith(prefix):
+                return await handler(scope, receive, send)
+        body = await self.read_body(receive)
+        # На HEAD отвечаем теми же заголовками, но без тела.
+        head = scope['method'] == 'HEAD'
+        if (settings.SERVE_STATIC and scope['method'] in ('GET', 'HEAD')
+                and self.static.match(scope['path'])):
+            static = self.static.lookup(
+                scope['path'], header_value(scope, b'accept-encoding')
+            )
+            if static is not None:
+                content, headers = static
+                return await self.send_response(
+                    send, 200, headers, content, head
+                )
+        environ = build_environ(scope, body)
+        cached = self.cached_response(environ)
+        if cached is not None:
+            return await self.send_response(
+                send, cached.status_code, response_headers(cached),
+                cached.content, head
+            )
+        loop = asyncio.get_event_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, self.call_wsgi, environ
+        )
+        await self.send_response(send, status, headers, content, head)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def send_response(self, send, status, headers, content,
+                            head=False):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        await send({
+            'type': 'http.response.body', 'body': b'' if head else content
+        })
+
+    def cached_response(self, environ):
+        """Ответ cache_page, если он уже есть в кэше (как в
+        FetchFromCacheMiddleware)."""
+        if (not settings.ASGI_SERVE_CACHED
+                or environ['REQUEST_METHOD'] not in ('GET', 'HEAD')):
+            return None
+        request = WSGIRequest(environ)
+        cache = caches['default']
+        cache_key = get_cache_key(request, '', 'GET', cache=cache)
+        if cache_key is None:
+            return None
+        response = cache.get(cache_key)
+        if response is not None:
+            response.setdefault('X-Frame-Options', settings.X_FRAME_OPTIONS)
+            if settings.COMPRESS_ENABLED:
+                compress_response(request, response)
+        return response
+
+    def call_wsgi(self, environ):
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['status'] = int(status.split(' ', 1)[0])
+            result['headers'] = [
+                (name.encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        iterable = self.wsgi(environ, start_response)
+        try:
+            content = b''.join(iterable)
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+        return result['status'], result['headers'], content
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    handler = ASGIHandler()
+    if settings.WARMUP_ON_START:
+        from .warmup import warm_up
+        warm_up()
+    return handler
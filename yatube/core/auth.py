@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def user_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша
+    USER_CACHE_ALIAS.
+
+    Запись сбрасывается сигналами при сохранении и удалении пользователя.
+    Кэш общий для процессов: после смены пароля или деактивации другие
+    воркеры не отдают старого пользователя, и проверка хэша сессии
+    больше не проходит.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = user_cache().get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache().set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,41 @@
+from django.core.cache.backends import filebased, locmem
+
+from .metrics import cache_requests
+
+_MISSING = object()
+KEY_KINDS = (
+    ('views.decorators.cache.', 'page'),
+    ('template.cache.', 'fragment'),
+    ('compressed:', 'compressed'),
+    ('missing:', 'missing'),
+    ('object:', 'object'),
+    ('following:', 'following'),
+)
+
+
+def key_kind(key):
+    """Тип кэша по префиксу ключа из KEY_KINDS, иначе other."""
+    for prefix, kind in KEY_KINDS:
+        if key.startswith(prefix):
+            return kind
+    return 'other'
+
+
+class MetricsCacheMixin:
+    """Считает попадания и промахи чтений из кэша."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            cache_requests.inc(key_kind(key), 'miss')
+            return default
+        cache_requests.inc(key_kind(key), 'hit')
+        return value
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(MetricsCacheMixin, filebased.FileBasedCache):
+    pass
@@ -0,0 +1,113 @@
+"""Сжатие HTML-ответов с кэшированием сжатого тела.
+
+Страница из cache_page на каждом попадании отдаёт одно и то же тело, и
+GZipMiddleware сжимала бы его заново. Здесь сжатое тело кэшируемого
+ответа (с max-age) кладётся в кэш рядом со страницей под ключом от
+хэша содержимого и кодировки, а повторное сжатие заменяется чтением
+из кэша. Сэкономленное время процессора видно в метрике
+yatube_compression_saved_seconds_total.
+"""
+import gzip
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_max_age, patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def encode(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESS_LEVEL)
+    return gzip.compress(content, settings.COMPRESS_LEVEL, mtime=0)
+
+
+def is_compressible(response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compressed_body(content, encoding, timeout):
+    """Сжатое тело и флаг, взято ли оно из кэша."""
+    cache = caches[settings.COMPRESS_CACHE_ALIAS]
+    digest = hashlib.md5(content).hexdigest()
+    key = f'compressed:{encoding}:{digest}'
+    cached = cache.get(key) if timeout else None
+    if cached is not None:
+        body, seconds = cached
+        metrics.compression_saved.inc(encoding, amount=seconds)
+        return body, True
+    start = time.process_time()
+    body = encode(content, encoding)
+    seconds = time.process_time() - start
+    metrics.compression_duration.inc(encoding, amount=seconds)
+    if timeout:
+        cache.set(key, (body, seconds), timeout)
+    return body, False
+
+
+def compress_response(request, response):
+    """Сжимает ответ под Accept-Encoding запроса, если это выгодно."""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not is_compressible(response):
+        return response
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+    content = response.content
+    if len(content) < settings.COMPRESS_MIN_SIZE:
+        return response
+    body, _ = compressed_body(content, encoding, get_max_age(response))
+    if len(body) >= len(content):
+        return response
+    metrics.compression_bytes.inc('in', amount=len(content))
+    metrics.compression_bytes.inc('out', amount=len(body))
+    response.content = body
+    response['Content-Length'] = str(len(body))
+    response['Content-Encoding'] = encoding
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        # Тело изменилось, как и в GZipMiddleware делаем ETag слабым.
+        response['ETag'] = f'W/{etag}'
+    return response
@@ -0,0 +1,61 @@
+"""Страницы ошибок, отрендеренные заранее.
+
+Обработчики handler404/handler500 и прочие отдают готовые байты: во
+время всплеска 404 или каскада 5xx ответ не обращается к БД, сессиям и
+шаблонизатору. Страницы рендерятся один раз, при прогреве воркера или
+на первой ошибке, для анонимного пользователя.
+"""
+from http import HTTPStatus
+
+from django.http import HttpRequest, HttpResponse
+from django.template.loader import render_to_string
+
+TEMPLATES = {
+    HTTPStatus.FORBIDDEN: 'core/403csrf.html',
+    HTTPStatus.NOT_FOUND: 'core/404.html',
+}
+SERVER_ERROR_TEMPLATE = 'core/5xx_server_error.html'
+SERVER_ERRORS = (
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.NOT_IMPLEMENTED,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+    HTTPStatus.HTTP_VERSION_NOT_SUPPORTED,
+    HTTPStatus.VARIANT_ALSO_NEGOTIATES,
+    HTTPStatus.INSUFFICIENT_STORAGE,
+    HTTPStatus.LOOP_DETECTED,
+    HTTPStatus.NOT_EXTENDED,
+    HTTPStatus.NETWORK_AUTHENTICATION_REQUIRED,
+)
+
+pages = {}
+
+
+def render_page(status):
+    template = TEMPLATES.get(status, SERVER_ERROR_TEMPLATE)
+    # Пустой HttpRequest: контекст-процессоры видят анонимного
+    # пользователя без сессии и сообщений.
+    return render_to_string(
+        template, {'status': status.value}, request=HttpRequest()
+    ).encode()
+
+
+def render_pages():
+    """Рендерит все страницы ошибок, возвращает их число."""
+    for status in (*TEMPLATES, *SERVER_ERRORS):
+        pages[status] = render_page(status)
+    return len(pages)
+
+
+def error_response(status):
+    if status not in pages:
+        pages[status] = render_page(status)
+    return HttpResponse(pages[status], status=status.value)
+
+
+def error_view(status):
+    def view(request, *args, **kwargs):
+        return error_response(status)
+    view.__name__ = f'error_{status.value}'
+    return view
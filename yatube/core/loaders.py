@@ -0,0 +1,62 @@
+"""Загрузчики шаблонов, убирающие лишние пробелы из HTML при компиляции.
+
+Отступы шаблонов проекта (post_card.html, header.html, paginator.html)
+попадают в каждый ответ и в каждый TextNode при рендеринге. Загрузчики
+сжимают пробелы в исходнике до компиляции, поэтому cached.Loader хранит
+уже очищенный шаблон, и на запрос это ничего не стоит.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.template.loaders import app_directories, filesystem
+
+# Содержимое этих элементов и тегов шаблона не трогаем: в <pre> и
+# <textarea> пробелы значимы, в <script> перевод строки закрывает
+# комментарий, а в {% %} могут быть строковые литералы.
+PRESERVED = re.compile(
+    r'(<(pre|textarea|script)\b.*?</\2\s*>|{%.*?%}|{{.*?}}|{#.*?#})',
+    re.S | re.I,
+)
+LINE_BREAK = re.compile(r'\s*\n\s*')
+SPACES = re.compile(r'[ \t\r\f\v]{2,}')
+
+
+def minify_html(source):
+    """Сводит пробелы с переводом строки к одному переводу строки, а
+    прочие серии пробелов к одному пробелу; браузер отображает такой
+    HTML так же."""
+    parts = []
+    position = 0
+    for match in PRESERVED.finditer(source):
+        parts.append(collapse(source[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(collapse(source[position:]))
+    return ''.join(parts)
+
+
+def collapse(text):
+    return SPACES.sub(' ', LINE_BREAK.sub('\n', text))
+
+
+class MinifyMixin:
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        if self.should_minify(origin):
+            return minify_html(contents)
+        return contents
+
+    def should_minify(self, origin):
+        if not settings.TEMPLATE_MINIFY or not origin.name.endswith('.html'):
+            return False
+        # Шаблоны Django и сторонних пакетов (письма, админка) не трогаем.
+        return os.path.abspath(origin.name).startswith(settings.BASE_DIR)
+
+
+class FilesystemLoader(MinifyMixin, filesystem.Loader):
+    pass
+
+
+class AppDirectoriesLoader(MinifyMixin, app_directories.Loader):
+    pass
@@ -0,0 +1,111 @@
+"""Очередь исходящих писем.
+
+QueuedEmailBackend только сохраняет письма в OutboxEmail, поэтому view
+(например, PasswordResetView) не ждёт почтовый сервер. Доставляет их
+deliver_outbox(): из фонового потока процесса (EMAIL_QUEUE_WORKER_THREAD)
+или из manage.py send_queued_mail, пачками через одно соединение
+EMAIL_QUEUE_BACKEND, с повторами при ошибках.
+"""
+import logging
+import pickle
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            message.connection = None
+            rows.append(OutboxEmail(message=pickle.dumps(message)))
+        OutboxEmail.objects.bulk_create(rows)
+        if rows and settings.EMAIL_QUEUE_WORKER_THREAD:
+            start_worker()
+            transaction.on_commit(_wakeup.set)
+        return len(rows)
+
+
+def claim_batch(batch_size):
+    """Захватывает пачку писем, чтобы их не отправил другой процесс."""
+    now = timezone.now()
+    due = OutboxEmail.objects.filter(
+        attempts__lt=settings.EMAIL_QUEUE_MAX_ATTEMPTS,
+        next_attempt__lte=now,
+    )
+    ids = list(due.values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    due.filter(pk__in=ids).update(
+        claim=token,
+        next_attempt=now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE),
+    )
+    return list(OutboxEmail.objects.filter(claim=token))
+
+
+def deliver_outbox(batch_size=None):
+    """Отправляет одну пачку писем, возвращает число отправленных."""
+    batch = claim_batch(batch_size or settings.EMAIL_QUEUE_BATCH_SIZE)
+    if not batch:
+        return 0
+    sent = []
+    with get_connection(settings.EMAIL_QUEUE_BACKEND) as connection:
+        for row in batch:
+            try:
+                connection.send_messages([pickle.loads(row.message)])
+            except Exception as error:
+                row.attempts += 1
+                row.last_error = repr(error)
+                row.next_attempt = timezone.now() + timedelta(
+                    seconds=settings.EMAIL_QUEUE_RETRY_DELAY
+                    * 2 ** (row.attempts - 1)
+                )
+                row.save(
+                    update_fields=['attempts', 'last_error', 'next_attempt']
+                )
+                logger.warning('Письмо %s не отправлено: %r', row.pk, error)
+            else:
+                sent.append(row.pk)
+    OutboxEmail.objects.filter(pk__in=sent).delete()
+    return len(sent)
+
+
+def run_worker():
+    while True:
+        _wakeup.wait(settings.EMAIL_QUEUE_POLL_INTERVAL)
+        _wakeup.clear()
+        try:
+            while deliver_outbox():
+                pass
+        except Exception:
+            logger.exception('Ошибка доставки очереди писем')
+        finally:
+            close_old_connections()
+
+
+def start_worker():
+    """Запускает фоновый поток доставки в этом процессе, если его нет."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=run_worker, name='email-outbox', daemon=True
+            )
+            _worker.start()
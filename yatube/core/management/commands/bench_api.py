@@ -0,0 +1,78 @@
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, User
+from posts.views import NUMBER_OF_POSTS_PER_PAGE
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность JSON API v1 и HTML-страниц '
+        'index, group_list и profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--fields', default='id,text,author')
+
+    def handle(self, *args, **options):
+        group = Group.objects.first()
+        author = User.objects.filter(posts__isnull=False).first()
+        if group is None or author is None:
+            raise CommandError('Нужны хотя бы одна группа и один пост.')
+        pairs = [
+            ('index', reverse('posts:index'), reverse('api:v1:post_list')),
+            (
+                'group',
+                reverse('posts:group_list', args=[group.slug]),
+                reverse('api:v1:group_posts', args=[group.slug]),
+            ),
+            (
+                'profile',
+                reverse('posts:profile', args=[author.username]),
+                reverse('api:v1:profile_posts', args=[author.username]),
+            ),
+        ]
+        client = Client()
+        # Столько же постов, сколько на HTML-странице
+        limit = {'limit': NUMBER_OF_POSTS_PER_PAGE}
+        for name, html, api in pairs:
+            for kind, path, params in (
+                ('html', html, {}),
+                ('json', api, limit),
+                ('json fields', api, {**limit, 'fields': options['fields']}),
+            ):
+                rate, size, queries = self.run(
+                    client, path, params, options['requests']
+                )
+                self.stdout.write(
+                    f'{name:>8} {kind:<12}: {rate:7.0f} запр/с, '
+                    f'{size:6d} байт, {queries} SQL'
+                )
+
+    def run(self, client, path, params, total):
+        cache.clear()
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # CaptureQueriesContext не подходит: request_started очищает
+        # connection.queries. Чтение может уйти на реплику (core.routers).
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            size = len(client.get(path, params).content)
+        start = time.perf_counter()
+        for _ in range(total):
+            # cache_page у index не должен подменять рендеринг.
+            cache.clear()
+            client.get(path, params)
+        return total / (time.perf_counter() - start), size, len(queries)
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+from core.asgi import ASGIHandler, build_environ
+
+
+def make_scope(path):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+class SlowWSGI:
+    """Добавляет к каждому запросу блокирующую задержку, имитируя ожидание
+    блокировки SQLite или генерацию миниатюры."""
+
+    def __init__(self, application, delay):
+        self.application = application
+        self.delay = delay
+
+    def __call__(self, environ, start_response):
+        time.sleep(self.delay)
+        return self.application(environ, start_response)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает однопоточный WSGI-воркер и core.asgi при '
+        'конкурентных запросах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/about/author/'])
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--delay', type=float, default=0.01,
+            help='Блокирующая задержка на запрос, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths']
+        total = options['requests']
+        wsgi = SlowWSGI(WSGIHandler(), options['delay'])
+
+        def start_response(status, headers, exc_info=None):
+            pass
+
+        start = time.perf_counter()
+        for number in range(total):
+            scope = make_scope(paths[number % len(paths)])
+            b''.join(wsgi(build_environ(scope, b''), start_response))
+        self.report('wsgi', total, time.perf_counter() - start)
+
+        asgi = ASGIHandler()
+        asgi.wsgi = SlowWSGI(asgi.wsgi, options['delay'])
+        elapsed = asyncio.run(
+            self.run_asgi(asgi, paths, total, options['concurrency'])
+        )
+        self.report('asgi', total, elapsed)
+        asgi.executor.shutdown()
+
+    async def run_asgi(self, asgi, paths, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(path):
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                pass
+
+            async with semaphore:
+                await asgi(make_scope(path), receive, send)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            request(paths[number % len(paths)]) for number in range(total)
+        ))
+        return time.perf_counter() - start
+
+    def report(self, name, total, elapsed):
+        self.stdout.write(
+            f'{name}: {total} запросов за {elapsed:.2f} c, '
+            f'{total / elapsed:.0f} req/s'
+        )
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.utils.cache import patch_cache_control
+
+from core.compression import compress_response
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает сжатие страницы на каждом запросе и сжатие с '
+        'кэшированием тела (core.compression).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='/')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--encoding', default='gzip')
+
+    def handle(self, *args, **options):
+        page = Client().get(options['path'])
+        request = RequestFactory().get(
+            options['path'], HTTP_ACCEPT_ENCODING=options['encoding']
+        )
+        self.stdout.write(f'страница: {len(page.content)} байт')
+        results = {}
+        for name, max_age in (('без кэша', None), ('с кэшем', 60)):
+            start = time.process_time()
+            for _ in range(options['requests']):
+                response = HttpResponse(
+                    page.content, content_type=page['Content-Type']
+                )
+                if max_age:
+                    patch_cache_control(response, max_age=max_age)
+                compress_response(request, response)
+            elapsed = time.process_time() - start
+            results[name] = elapsed
+            self.stdout.write(
+                f'{name}: {elapsed / options["requests"] * 1e6:.0f} мкс '
+                f'CPU на ответ, {len(response.content)} байт'
+            )
+        saved = results['без кэша'] - results['с кэшем']
+        self.stdout.write(
+            f'сэкономлено CPU: {saved * 1000:.0f} мс на '
+            f'{options["requests"]} запросов'
+        )
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from posts.graph import FollowGraph
+
+
+class Command(BaseCommand):
+    help = (
+        'Память на ребро и время запросов posts.graph против словаря '
+        'множеств на синтетическом графе подписок или на таблице Follow.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument(
+            '--from-db', action='store_true',
+            help='Граф из таблицы Follow вместо синтетического.'
+        )
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            graph = FollowGraph()
+            graph.reload()
+            edges = [
+                (user_id, author_id)
+                for user_id in range(len(graph.following_edges.csr.offsets))
+                for author_id in graph.following(user_id)
+            ]
+        else:
+            edges = self.synthetic(options['users'], options['follows'])
+        if not edges:
+            self.stdout.write('Подписок нет.')
+            return
+        self.stdout.write(f'рёбер: {len(edges)}')
+
+        # tracemalloc замедляет сборку, поэтому время меряем отдельно.
+        start = time.perf_counter()
+        graph = self.build_graph(edges)
+        build = time.perf_counter() - start
+        _, graph_bytes = self.measure(self.build_graph, edges)
+        _, sets_bytes = self.measure(self.build_sets, edges)
+        self.stdout.write(
+            f'CSR: {graph_bytes / len(edges):.1f} байт на ребро '
+            f'(сборка {build:.2f} с), dict[set]: '
+            f'{sets_bytes / len(edges):.1f} байт на ребро'
+        )
+
+        users = [random.choice(edges)[0] for _ in range(options['queries'])]
+        queries = {
+            'following': lambda user: graph.following(user),
+            'is_following': lambda user: graph.is_following(user, 1),
+            'mutual': lambda user: graph.mutual(user),
+            'reach(2)': lambda user: graph.reach(user),
+        }
+        for name, query in queries.items():
+            timings = []
+            for user in users:
+                start = time.perf_counter()
+                query(user)
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(
+                f'{name:>12}: медиана '
+                f'{statistics.median(timings) * 1e6:.1f} мкс'
+            )
+
+    def synthetic(self, users, follows):
+        """Подписки со степенным распределением популярности авторов."""
+        random.seed(0)
+        edges = set()
+        for user in range(1, users + 1):
+            for _ in range(random.randint(0, 2 * follows)):
+                author = 1 + int(users * random.random() ** 3)
+                if author != user:
+                    edges.add((user, author))
+        return sorted(edges)
+
+    def measure(self, build, edges):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        result = build(edges)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, after - before
+
+    def build_graph(self, edges):
+        graph = FollowGraph()
+        graph.load_edges(edges)
+        return graph
+
+    def build_sets(self, edges):
+        following = defaultdict(set)
+        followers = defaultdict(set)
+        for user, author in edges:
+            following[user].add(author)
+            followers[author].add(user)
+        return following, followers
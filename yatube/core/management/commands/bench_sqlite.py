@@ -0,0 +1,95 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+SEED_ROWS: int = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность смешанной нагрузки '
+        'чтение/запись для профилей SQLITE_PROFILES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        for name, pragmas in settings.SQLITE_PROFILES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.seed(path, pragmas)
+                result = self.run(path, pragmas, options)
+            self.stdout.write(
+                f'{name:>12}: {result["reads"] / options["seconds"]:9.0f} '
+                f'reads/s {result["writes"] / options["seconds"]:8.0f} '
+                f'writes/s {result["errors"]:6d} lock errors'
+            )
+
+    def seed(self, path, pragmas):
+        db = sqlite3.connect(path)
+        apply_pragmas(db, pragmas)
+        db.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+            'pub_date REAL)'
+        )
+        db.execute('CREATE INDEX post_pub_date ON post (pub_date DESC)')
+        db.executemany(
+            'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+            [('seed', time.time()) for _ in range(SEED_ROWS)]
+        )
+        db.commit()
+        db.close()
+
+    def run(self, path, pragmas, options):
+        result = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def worker():
+            db = sqlite3.connect(path)
+            apply_pragmas(db, pragmas)
+            counts = {'reads': 0, 'writes': 0, 'errors': 0}
+            while time.monotonic() < deadline:
+                try:
+                    if random.random() < options['write_ratio']:
+                        db.execute(
+                            'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+                            ('bench', time.time())
+                        )
+                        db.commit()
+                        counts['writes'] += 1
+                    else:
+                        db.execute(
+                            'SELECT id, text FROM post '
+                            'ORDER BY pub_date DESC LIMIT 10'
+                        ).fetchall()
+                        db.execute('SELECT COUNT(*) FROM post').fetchone()
+                        counts['reads'] += 1
+                except sqlite3.OperationalError:
+                    db.rollback()
+                    counts['errors'] += 1
+            db.close()
+            with lock:
+                for key, value in counts.items():
+                    result[key] += value
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
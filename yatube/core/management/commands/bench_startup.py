@@ -0,0 +1,68 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Дочерний процесс поднимает воркер так же, как gunicorn: импортирует
+# WSGI-приложение, и сообщает время загрузки и пиковый RSS.
+BOOT = """
+import json, resource, sys, time
+start = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1].rsplit('.', 1)[0])
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+}))
+"""
+
+PROFILES = {
+    'production': {'DJANGO_DEBUG': '', 'DEBUG_TOOLBAR': ''},
+    'development': {'DJANGO_DEBUG': '1', 'DEBUG_TOOLBAR': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время загрузки воркера и его RSS для профилей '
+        'настроек production и development.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--no-warmup', action='store_true',
+            help='Не выполнять core.warmup при загрузке.'
+        )
+
+    def handle(self, *args, **options):
+        for name, overrides in PROFILES.items():
+            env = {
+                **os.environ,
+                **overrides,
+                'DJANGO_SETTINGS_MODULE': os.environ.get(
+                    'DJANGO_SETTINGS_MODULE', 'yatube.settings'
+                ),
+            }
+            if options['no_warmup']:
+                env['WARMUP_ON_START'] = ''
+            runs = [self.boot(env) for _ in range(options['runs'])]
+            seconds = min(run['seconds'] for run in runs)
+            rss = statistics.median(run['rss'] for run in runs) / 1024
+            self.stdout.write(
+                f'{name}: загрузка {seconds * 1000:.0f} мс, '
+                f'RSS {rss:.1f} МБ, модулей {runs[0]["modules"]}'
+            )
+
+    def boot(self, env):
+        output = subprocess.run(
+            [sys.executable, '-c', BOOT, settings.WSGI_APPLICATION],
+            env=env, cwd=settings.BASE_DIR, check=True,
+            stdout=subprocess.PIPE,
+        ).stdout
+        return json.loads(output.decode().splitlines()[-1])
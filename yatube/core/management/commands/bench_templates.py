@@ -0,0 +1,46 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер страниц и время рендеринга с core.loaders и '
+        'без сжатия пробелов в шаблонах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/'])
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for minify in (False, True):
+            templates = copy.deepcopy(settings.TEMPLATES)
+            with override_settings(
+                TEMPLATE_MINIFY=minify, TEMPLATES=templates
+            ):
+                self.run(minify, options['paths'], options['requests'])
+
+    def run(self, minify, paths, total):
+        client = Client()
+        for path in paths:
+            cache.clear()
+            size = len(client.get(path).content)
+            timings = []
+            for _ in range(total):
+                # cache_page не должен подменять рендеринг.
+                cache.clear()
+                start = time.perf_counter()
+                client.get(path)
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(
+                f'{"сжатые" if minify else "исходные"} {path}: '
+                f'{size} байт, медиана '
+                f'{statistics.median(timings) * 1000:.2f} мс на запрос'
+            )
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.routers import replica_lag
+
+
+class Command(BaseCommand):
+    help = 'Показывает отставание реплик REPLICA_DATABASES в секундах.'
+
+    def handle(self, *args, **options):
+        for alias in settings.REPLICA_DATABASES:
+            lag = replica_lag(alias)
+            if lag is None:
+                self.stdout.write(
+                    f'{alias}: нет метки, запустите sync_replica'
+                )
+            else:
+                self.stdout.write(f'{alias}: {lag:.1f} c')
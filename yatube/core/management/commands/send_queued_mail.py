@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutboxEmail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, проверять очередь каждые '
+                 'EMAIL_QUEUE_POLL_INTERVAL секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = deliver_outbox()
+            while sent:
+                self.stdout.write(f'Отправлено писем: {sent}')
+                sent = deliver_outbox()
+            if not options['loop']:
+                return
+            time.sleep(settings.EMAIL_QUEUE_POLL_INTERVAL)
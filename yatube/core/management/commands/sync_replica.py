@@ -0,0 +1,35 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from core.models import ReplicationHeartbeat
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики REPLICA_DATABASES '
+        'и обновляет метку, по которой считается отставание.'
+    )
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError(
+                'Репликацию не-SQLite баз выполняет сервер базы данных.'
+            )
+        ReplicationHeartbeat.objects.using('default').update_or_create(
+            pk=1, defaults={'updated': timezone.now()}
+        )
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            for alias in settings.REPLICA_DATABASES:
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{alias}: синхронизирована')
+        finally:
+            source.close()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает процесс как при старте воркера и сравнивает первый '
+        'запрос с повторным.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='/about/author/')
+        parser.add_argument(
+            '--no-warmup', action='store_true',
+            help='Не прогревать: показать первый запрос холодного воркера.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['no_warmup']:
+            for name, (result, elapsed) in warm_up().items():
+                self.stdout.write(
+                    f'{name:>20}: {result} за {elapsed * 1000:.1f} мс'
+                )
+        client = Client()
+        for label in ('первый запрос', 'повторный'):
+            start = time.perf_counter()
+            client.get(options['path'])
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(f'{label:>20}: {elapsed:.1f} мс')
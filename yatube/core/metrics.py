@@ -0,0 +1,272 @@
+"""Метрики в формате Prometheus.
+
+Каждый поток пишет в собственный словарь значений, поэтому инкремент не
+берёт блокировок; словари потоков суммируются только при сборе метрик.
+При сборе словари завершившихся потоков переносятся в общий словарь
+base, поэтому сервер, создающий поток на запрос, не копит шарды.
+Для pre-fork серверов процесс периодически сбрасывает свои значения в
+METRICS_MULTIPROCESS_DIR, а /metrics суммирует файлы всех процессов.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (
+    1024, 10 * 1024, 100 * 1024, 512 * 1024, 1024 ** 2, 5 * 1024 ** 2,
+    10 * 1024 ** 2,
+)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        # (weakref на поток, словарь значений потока)
+        self.shards = []
+        self.base = defaultdict(float)
+        self.local = threading.local()
+        self.shards_lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def shard(self):
+        """Словарь значений текущего потока."""
+        try:
+            return self.local.values
+        except AttributeError:
+            values = defaultdict(float)
+            thread = weakref.ref(threading.current_thread())
+            with self.shards_lock:
+                self.shards.append((thread, values))
+            self.local.values = values
+            return values
+
+    def fold_dead_shards(self):
+        """Переносит значения завершившихся потоков в base. Вызывается
+        под shards_lock."""
+        alive = []
+        for thread, values in self.shards:
+            owner = thread()
+            if owner is not None and owner.is_alive():
+                alive.append((thread, values))
+                continue
+            for key, value in values.items():
+                self.base[key] += value
+        self.shards = alive
+
+    def local_samples(self):
+        with self.shards_lock:
+            self.fold_dead_shards()
+            shards = [values for _, values in self.shards]
+            samples = defaultdict(float, self.base)
+        for shard in shards:
+            # dict() копирует словарь целиком под GIL, поэтому владелец
+            # шарда может писать в него одновременно со сбором.
+            for key, value in dict(shard).items():
+                samples[key] += value
+        return samples
+
+    def _path(self, pid):
+        return os.path.join(
+            settings.METRICS_MULTIPROCESS_DIR, f'metrics-{pid}.json'
+        )
+
+    def flush(self):
+        """Сохраняет значения процесса для сбора из других процессов."""
+        if not settings.METRICS_MULTIPROCESS_DIR:
+            return
+        self.last_flush = time.monotonic()
+        path = self._path(os.getpid())
+        data = [
+            [name, list(labels), suffix, value]
+            for (name, labels, suffix), value in self.local_samples().items()
+        ]
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as tmp_file:
+            json.dump(data, tmp_file)
+        os.replace(tmp_path, path)
+
+    def maybe_flush(self):
+        if (time.monotonic() - self.last_flush
+                >= settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def samples(self):
+        """Значения текущего процесса плюс сохранённые другими."""
+        samples = self.local_samples()
+        directory = settings.METRICS_MULTIPROCESS_DIR
+        if not directory:
+            return samples
+        own = os.path.basename(self._path(os.getpid()))
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == own:
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as data_file:
+                    data = json.load(data_file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, suffix, value in data:
+                samples[(name, tuple(labels), suffix)] += value
+        return samples
+
+    def exposition(self):
+        """Текст в формате Prometheus text exposition 0.0.4."""
+        by_metric = defaultdict(dict)
+        for (name, labels, suffix), value in self.samples().items():
+            by_metric[name][(labels, suffix)] = value
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.render(by_metric.get(name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def inc(self, *labels, amount=1):
+        registry.shard()[(self.name, labels, '')] += amount
+
+    def render(self, values):
+        for (labels, _), value in sorted(values.items()):
+            yield (
+                f'{self.name}{_labels(self.labelnames, labels)} '
+                f'{_number(value)}'
+            )
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        shard = registry.shard()
+        shard[(self.name, labels, bisect_left(self.buckets, value))] += 1
+        shard[(self.name, labels, 'sum')] += value
+        shard[(self.name, labels, 'count')] += 1
+
+    def render(self, values):
+        series = defaultdict(dict)
+        for (labels, suffix), value in values.items():
+            series[labels][suffix] = value
+        for labels, data in sorted(series.items()):
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += data.get(index, 0)
+                bucket_labels = _labels(
+                    self.labelnames, labels, [('le', _number(bound))]
+                )
+                yield (
+                    f'{self.name}_bucket{bucket_labels} '
+                    f'{_number(cumulative)}'
+                )
+            label_text = _labels(self.labelnames, labels)
+            yield f'{self.name}_sum{label_text} {_number(data.get("sum", 0))}'
+            yield (
+                f'{self.name}_count{label_text} '
+                f'{_number(data.get("count", 0))}'
+            )
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+http_requests = registry.register(Counter(
+    'yatube_http_requests_total',
+    'Обработанные HTTP-запросы.',
+    ('view', 'method', 'status'),
+))
+http_request_duration = registry.register(Histogram(
+    'yatube_http_request_duration_seconds',
+    'Время обработки HTTP-запроса.',
+    ('view',),
+))
+cache_requests = registry.register(Counter(
+    'yatube_cache_requests_total',
+    'Чтения из кэша по типу кэша и результату.',
+    ('cache', 'result'),
+))
+db_queries = registry.register(Counter(
+    'yatube_db_queries_total',
+    'SQL-запросы по алиасу базы.',
+    ('alias',),
+))
+db_query_duration = registry.register(Counter(
+    'yatube_db_query_duration_seconds_total',
+    'Суммарное время SQL-запросов.',
+    ('alias',),
+))
+thumbnail_duration = registry.register(Histogram(
+    'yatube_thumbnail_duration_seconds',
+    'Время генерации миниатюр sorl-thumbnail.',
+))
+upload_size = registry.register(Histogram(
+    'yatube_upload_size_bytes',
+    'Размер загруженных файлов.',
+    buckets=SIZE_BUCKETS,
+))
+rate_limited = registry.register(Counter(
+    'yatube_rate_limited_total',
+    'Запросы, отклонённые RateLimitMiddleware.',
+    ('view', 'scope'),
+))
+compression_duration = registry.register(Counter(
+    'yatube_compression_seconds_total',
+    'Время процессора на сжатие ответов.',
+    ('encoding',),
+))
+compression_saved = registry.register(Counter(
+    'yatube_compression_saved_seconds_total',
+    'Время процессора, сэкономленное сжатыми телами из кэша.',
+    ('encoding',),
+))
+compression_bytes = registry.register(Counter(
+    'yatube_compression_bytes_total',
+    'Размер сжимаемых ответов до (in) и после (out) сжатия.',
+    ('direction',),
+))
@@ -0,0 +1,182 @@
+import math
+import time
+from contextlib import ExitStack
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+from . import metrics
+from .compression import compress_response
+from .profiling import is_profiled_view, register_view, unregister_view
+from .ratelimit import TokenBucket
+from .routers import state as routing_state
+from .routers import use_replica
+from .slow_queries import slow_query_log
+
+
+class ProfilerMiddleware:
+    """Отмечает потоки, обрабатывающие профилируемые view."""
+
+    def __init__(self, get_response):
+        if not settings.SAMPLING_PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            unregister_view()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if is_profiled_view(request.resolver_match):
+            register_view(request.resolver_match.view_name)
+
+
+class SlowQueryLogMiddleware:
+    """Записывает медленные SQL-запросы в core.slow_queries.slow_query_log."""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrapper = slow_query_log.wrapper(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """Собирает метрики запросов, SQL и загрузок для /metrics."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(self.count_query)
+                )
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        metrics.http_requests.inc(
+            view, request.method, str(response.status_code)
+        )
+        metrics.http_request_duration.observe(
+            time.perf_counter() - start, view
+        )
+        # request.FILES смотрим, только если view уже разобрала тело.
+        if hasattr(request, '_files'):
+            for upload in request.FILES.values():
+                metrics.upload_size.observe(upload.size)
+        metrics.registry.maybe_flush()
+        return response
+
+    def count_query(self, execute, sql, params, many, context):
+        alias = context['connection'].alias
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.db_queries.inc(alias)
+            metrics.db_query_duration.inc(
+                alias, amount=time.perf_counter() - start
+            )
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик для REPLICA_READ_VIEWS."""
+
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replica(False)
+        try:
+            response = self.get_response(request)
+            if routing_state.wrote:
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                )
+            return response
+        finally:
+            use_replica(False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replica(
+            request.method in self.safe_methods
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name
+            in settings.REPLICA_READ_VIEWS
+        )
+
+
+class RateLimitMiddleware:
+    """Отвечает 429 на запросы к view из RATE_LIMITS сверх лимита.
+
+    Проверка идёт в process_view до CsrfViewMiddleware, то есть до
+    разбора тела запроса и до обращений view к базе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.RATE_LIMITS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        limits = settings.RATE_LIMITS.get(view_name)
+        if limits is None or request.method not in limits.get(
+            'methods', (request.method,)
+        ):
+            return None
+        buckets = []
+        if 'ip' in limits:
+            buckets.append(('ip', request.META.get('REMOTE_ADDR', '')))
+        if 'user' in limits and request.user.is_authenticated:
+            buckets.append(('user', request.user.pk))
+        for scope, ident in buckets:
+            wait = TokenBucket(
+                f'{view_name}:{scope}:{ident}', limits[scope]
+            ).consume()
+            if wait:
+                metrics.rate_limited.inc(view_name, scope)
+                response = HttpResponse(
+                    'Слишком много запросов, попробуйте позже.',
+                    content_type='text/plain; charset=utf-8',
+                    status=HTTPStatus.TOO_MANY_REQUESTS.value,
+                )
+                response['Retry-After'] = math.ceil(wait)
+                return response
+        return None
+
+
+class CompressionMiddleware:
+    """Сжимает ответы; см. core.compression."""
+
+    def __init__(self, get_response):
+        if not settings.COMPRESS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return compress_response(request, self.get_response(request))
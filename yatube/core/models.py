@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class PubDateModel(models.Model):
@@ -21,3 +22,30 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class ReplicationHeartbeat(models.Model):
+    """Метка времени, по которой считается отставание реплик."""
+    updated = models.DateTimeField('Обновлено')
+
+    class Meta:
+        verbose_name = 'Метка репликации'
+        verbose_name_plural = 'Метки репликации'
+
+
+class OutboxEmail(CreatedModel):
+    """Письмо в очереди на отправку (core.mail.QueuedEmailBackend)."""
+    message = models.BinaryField('Письмо')
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    next_attempt = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+        db_index=True
+    )
+    claim = models.CharField('Захвачено', max_length=32, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ['pk']
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
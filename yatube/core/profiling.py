@@ -0,0 +1,162 @@
+"""Семплирующий профайлер view приложения posts.
+
+ProfilerMiddleware отмечает потоки, которые обслуживают профилируемые
+view, а SamplingProfiler снимает их стеки из отдельного потока. Прогон
+запускает фоновый поток процесса (BackgroundProfiler): по POST на
+core:sampling_profile, результат забирается GET позже, или по сигналу
+SAMPLING_PROFILER_SIGNAL, результат пишется в
+SAMPLING_PROFILER_DUMP_DIR. Так профиль снимается и в воркере с одним
+потоком, где запрос к самому профайлеру не может ждать, пока тот же
+поток обслужит view.
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Потоки, которые сейчас обрабатывают запрос к профилируемой view:
+# {ident потока: имя view}. Заполняется ProfilerMiddleware.
+_active_views = {}
+
+
+def register_view(view_name):
+    _active_views[threading.get_ident()] = view_name
+
+
+def unregister_view():
+    _active_views.pop(threading.get_ident(), None)
+
+
+def is_profiled_view(resolver_match):
+    """Проверяет, попадает ли view в профилируемые namespace."""
+    if resolver_match is None:
+        return False
+    return any(
+        namespace in settings.SAMPLING_PROFILER_NAMESPACES
+        for namespace in resolver_match.namespaces
+    )
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+
+
+def _collapse(frame, view_name):
+    """Стек потока в формате collapsed-stack: от корня к листу через ';'."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame).replace(';', ':'))
+        frame = frame.f_back
+    labels.append(view_name)
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Семплирующий профайлер потоков, обслуживающих view."""
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.SAMPLING_PROFILER_INTERVAL
+        self.stacks = Counter()
+        self.samples = 0
+
+    def sample(self):
+        frames = sys._current_frames()
+        own = threading.get_ident()
+        for ident, view_name in list(_active_views.items()):
+            frame = frames.get(ident)
+            if ident == own or frame is None:
+                continue
+            self.stacks[_collapse(frame, view_name)] += 1
+        self.samples += 1
+
+    def run(self, seconds):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self):
+        """Результат в формате, понятном flamegraph.pl и speedscope."""
+        return ''.join(
+            f'{stack} {count}\n'
+            for stack, count in self.stacks.most_common()
+        )
+
+
+class BackgroundProfiler:
+    """Один прогон SamplingProfiler за раз в фоновом потоке процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds, on_finish=None):
+        """Запускает прогон; False, если предыдущий ещё идёт."""
+        with self.lock:
+            if self.running:
+                return False
+            self.thread = threading.Thread(
+                target=self.run, args=(seconds, on_finish),
+                name='sampling-profiler', daemon=True,
+            )
+            self.thread.start()
+            return True
+
+    def run(self, seconds, on_finish):
+        profiler = SamplingProfiler().run(seconds)
+        self.last = profiler
+        if on_finish is not None:
+            on_finish(profiler)
+
+    def wait(self, timeout=None):
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+background = BackgroundProfiler()
+
+
+def dump(profiler):
+    """Пишет результат прогона по сигналу в SAMPLING_PROFILER_DUMP_DIR."""
+    path = os.path.join(
+        settings.SAMPLING_PROFILER_DUMP_DIR,
+        f'posts-profile-{os.getpid()}-{int(time.time())}.folded',
+    )
+    with open(path, 'w') as dump_file:
+        dump_file.write(profiler.collapsed())
+    logger.warning(
+        'Профиль posts записан в %s, семплов: %s, стеков: %s',
+        path, profiler.samples, len(profiler.stacks),
+    )
+    return path
+
+
+def handle_signal(signum, frame):
+    background.start(settings.SAMPLING_PROFILER_SIGNAL_SECONDS, dump)
+
+
+def install_signal_handler():
+    """Включает прогон по SAMPLING_PROFILER_SIGNAL (kill -USR2 <pid>)."""
+    signum = getattr(signal, settings.SAMPLING_PROFILER_SIGNAL, None)
+    if signum is None:
+        return
+    try:
+        signal.signal(signum, handle_signal)
+    except ValueError:
+        # Не главный поток (например, runserver с автоперезагрузкой)
+        pass
@@ -0,0 +1,52 @@
+"""Ограничение частоты запросов к view по RATE_LIMITS.
+
+Каждая корзина - token bucket в форме GCRA: в кэше хранится одно
+число, "теоретическое время прибытия" (TAT) следующего запроса, и
+двигается атомарным cache.incr(). Поэтому проверка - одно-два обращения
+к кэшу без блокировок на нашей стороне, и корзина общая для всех
+воркеров, если общий кэш.
+"""
+import math
+import time
+
+from django.core.cache import cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/m' -> (ёмкость корзины, миллисекунд на один токен)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, PERIODS[period] * 1000 / count
+
+
+class TokenBucket:
+    def __init__(self, key, rate):
+        self.key = f'ratelimit:{key}'
+        self.capacity, self.interval = parse_rate(rate)
+        self.tolerance = (self.capacity - 1) * self.interval
+        self.timeout = math.ceil((self.tolerance + self.interval) / 1000) + 1
+
+    def consume(self, now=None):
+        """Забирает токен. Возвращает 0, если можно, иначе сколько секунд
+        ждать следующего токена."""
+        now = int((time.time() if now is None else now) * 1000)
+        interval = int(self.interval)
+        if cache.add(self.key, now + interval, self.timeout):
+            return 0
+        try:
+            tat = cache.incr(self.key, interval) - interval
+        except ValueError:
+            cache.set(self.key, now + interval, self.timeout)
+            return 0
+        if tat < now:
+            # Корзина простаивала и полна; гонка двух воркеров здесь
+            # даёт лишь на токен больше.
+            cache.set(self.key, now + interval, self.timeout)
+            return 0
+        if tat - now > self.tolerance:
+            cache.decr(self.key, interval)
+            return (tat - now - self.tolerance) / 1000
+        cache.touch(self.key, self.timeout)
+        return 0
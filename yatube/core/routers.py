@@ -0,0 +1,57 @@
+import random
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+# Состояние маршрутизации текущего запроса; вне запросов (команды,
+# тесты, фоновые задачи) чтения идут в основную базу.
+state = threading.local()
+
+
+def use_replica(enabled):
+    """Включает реплику до конца запроса; реплика выбирается один раз."""
+    state.replica = (
+        random.choice(settings.REPLICA_DATABASES)
+        if enabled and settings.REPLICA_DATABASES else None
+    )
+    state.wrote = False
+
+
+class ReplicaRouter:
+    """Чтения моделей REPLICA_APPS в read-only view уходят на реплику.
+
+    Сессии, пользователи и contenttypes всегда читаются из default:
+    реплика обновляется sync_replica, и вход, выход или смена пароля
+    на ней были бы видны не сразу. После любой записи чтения до конца
+    запроса идут в основную базу, а ReplicaMiddleware закрепляет за
+    клиентом основную базу ещё на REPLICA_PIN_SECONDS, чтобы он сразу
+    увидел свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(state, 'replica', None)
+        if replica and model._meta.app_label in settings.REPLICA_APPS:
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        state.replica = None
+        state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+def replica_lag(alias):
+    """Отставание реплики по метке ReplicationHeartbeat, в секундах."""
+    from .models import ReplicationHeartbeat
+
+    heartbeat = ReplicationHeartbeat.objects.using(alias).first()
+    if heartbeat is None:
+        return None
+    return (timezone.now() - heartbeat.updated).total_seconds()
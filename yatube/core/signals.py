@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth import user_cache, user_cache_key
+from .db import apply_pragmas
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Применяет профиль SQLITE_PRAGMAS к каждому новому соединению."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Сбрасывает пользователя в кэше CachedModelBackend, повторно после
+    коммита: запрос до коммита мог снова положить старую версию."""
+    key = user_cache_key(instance.pk)
+    user_cache().delete(key)
+    transaction.on_commit(lambda: user_cache().delete(key))
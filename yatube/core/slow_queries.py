@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def _template_line():
+    """Шаблон и строка, из которых был выполнен запрос, если есть."""
+    frame = sys._getframe()
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    return ''
+
+
+class SlowQueryLog:
+    """Кольцевой буфер медленных запросов, сгруппированных по месту вызова.
+
+    Запросы группируются по тексту SQL, view и строке шаблона; когда
+    групп становится больше size, вытесняется давно не встречавшаяся.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or settings.SLOW_QUERY_LOG_SIZE
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def record(self, connection, sql, params, many, duration, view):
+        template = _template_line()
+        key = (connection.alias, sql, view, template)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                entry = {
+                    'alias': connection.alias,
+                    'sql': sql,
+                    'view': view,
+                    'template': template,
+                    'count': 0,
+                    'total': 0.0,
+                    'max': 0.0,
+                    'plan': None,
+                }
+            entry['count'] += 1
+            entry['total'] += duration
+            entry['max'] = max(entry['max'], duration)
+            self.entries[key] = entry
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        if entry['plan'] is None and not many:
+            entry['plan'] = self.explain(connection, sql, params)
+
+    def explain(self, connection, sql, params):
+        """EXPLAIN QUERY PLAN для SELECT-запросов на SQLite."""
+        if (connection.vendor != 'sqlite'
+                or not sql.lstrip().upper().startswith('SELECT')):
+            return ''
+        self.local.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return '\n'.join(row[-1] for row in cursor.fetchall())
+        except Exception as error:
+            return f'EXPLAIN failed: {error}'
+        finally:
+            self.local.explaining = False
+
+    def wrapper(self, request):
+        """Обёртка для connection.execute_wrapper() на время запроса."""
+        def execute_wrapper(execute, sql, params, many, context):
+            if getattr(self.local, 'explaining', False):
+                return execute(sql, params, many, context)
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                if duration >= settings.SLOW_QUERY_THRESHOLD:
+                    match = request.resolver_match
+                    self.record(
+                        context['connection'], sql, params, many, duration,
+                        match.view_name if match else request.path,
+                    )
+        return execute_wrapper
+
+    def top(self):
+        """Группы запросов по убыванию суммарного времени."""
+        with self.lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        return sorted(entries, key=lambda entry: -entry['total'])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,331 @@
+"""Сборка и раздача статики с долгим кэшированием.
+
+collectstatic с CompressedManifestStaticFilesStorage добавляет к именам
+файлов хэш содержимого (css/bootstrap.min.3b2a….css), рядом кладёт
+сжатые копии .gz и, если установлен пакет brotli, .br, а при
+STATIC_PURGE_CSS удаляет из CSS правила для классов, которых нет в
+шаблонах и скриптах. StaticFiles отдаёт такие файлы из памяти со
+сжатой копией под Accept-Encoding клиента и заголовком
+Cache-Control: immutable: имя файла меняется вместе с содержимым.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.template import engines
+from django.utils._os import safe_join
+
+from .compression import accepted_encodings, brotli
+from .warmup import project_template_dirs
+
+IMMUTABLE = b'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_CLASS = re.compile(r'\.(-?[_a-zA-Z][_a-zA-Z0-9-]*)')
+WORD = re.compile(r'[_a-zA-Z][_a-zA-Z0-9-]*')
+
+
+def compress(content):
+    """{расширение: сжатые байты} для вариантов, которые меньше
+    исходника."""
+    variants = {'.gz': gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    return {
+        suffix: data for suffix, data in variants.items()
+        if len(data) < len(content) * 0.95
+    }
+
+
+def used_words(extra_dirs=()):
+    """Слова из шаблонов проекта и скриптов: кандидаты в имена классов."""
+    dirs = list(extra_dirs)
+    for engine in engines.all():
+        dirs += project_template_dirs(engine)
+    words = set(settings.STATIC_PURGE_CSS_SAFELIST)
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if not filename.endswith(('.html', '.txt', '.js')):
+                    continue
+                path = os.path.join(root, filename)
+                with open(path, encoding='utf-8', errors='ignore') as f:
+                    words.update(WORD.findall(f.read()))
+    return words
+
+
+def split_selectors(prelude):
+    """Делит список селекторов по запятым вне скобок."""
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return [selector.strip() for selector in selectors]
+
+
+def block_end(css, start):
+    """Индекс закрывающей скобки блока, открытого перед start."""
+    depth, index, quote = 1, start, None
+    while index < len(css):
+        char = css[index]
+        if quote:
+            if char == '\\':
+                index += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    return len(css)
+
+
+def purge_css(css, words):
+    """Удаляет селекторы с классами не из words; правила без
+    оставшихся селекторов и пустые @media удаляются целиком."""
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.S)
+    output, index = [], 0
+    while index < len(css):
+        brace = css.find('{', index)
+        semicolon = css.find(';', index)
+        if brace == -1:
+            output.append(css[index:])
+            break
+        if css[index:].lstrip().startswith('@') and -1 < semicolon < brace:
+            # @charset, @import: без блока
+            output.append(css[index:semicolon + 1])
+            index = semicolon + 1
+            continue
+        prelude = css[index:brace]
+        end = block_end(css, brace + 1)
+        body = css[brace + 1:end]
+        index = end + 1
+        at_rule = prelude.strip()
+        if at_rule.startswith(('@media', '@supports')):
+            body = purge_css(body, words)
+            if body.strip():
+                output.append(f'{prelude}{{{body}}}')
+            continue
+        if at_rule.startswith('@'):
+            output.append(f'{prelude}{{{body}}}')
+            continue
+        # Селекторы с экранированными символами не разбираем и оставляем.
+        selectors = [
+            selector for selector in split_selectors(prelude)
+            if '\\' in selector or all(
+                name in words for name in CSS_CLASS.findall(selector)
+            )
+        ]
+        if selectors:
+            output.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(output)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # До первого collectstatic (тесты, разработка) отдаём исходное
+        # имя вместо ValueError из {% static %}.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run and settings.STATIC_PURGE_CSS:
+            self.purge(paths)
+        hashed = {}
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if isinstance(hashed_name, str):
+                hashed[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # Сжимаем после всех проходов: CSS переписывается на каждом.
+        for name, hashed_name in hashed.items():
+            for target in (name, hashed_name):
+                if target.endswith(settings.STATIC_COMPRESS_EXTENSIONS):
+                    self.write_compressed(target)
+
+    def purge(self, paths):
+        words = used_words({
+            os.path.dirname(self.path(name)) for name in paths
+            if name.endswith('.js')
+        })
+        for name in paths:
+            if name not in settings.STATIC_PURGE_CSS_FILES:
+                continue
+            with self.open(name) as css_file:
+                css = css_file.read().decode('utf-8')
+            self.delete(name)
+            self._save(name, ContentFile(purge_css(css, words).encode()))
+            # Хэш и копию с хэшем считаем от очищенного файла, а не от
+            # исходника в STATICFILES_DIRS.
+            paths[name] = (self, name)
+
+    def write_compressed(self, name):
+        with self.open(name) as static_file:
+            content = static_file.read()
+        for suffix, data in compress(content).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(data))
+
+
+class StaticFiles:
+    """Отдаёт файлы STATIC_URL из памяти, читая каждый файл один раз.
+
+    Файлы ищутся в STATIC_ROOT, а до collectstatic - через finders. Все
+    варианты в памяти занимают не больше STATIC_MEMORY_LIMIT байт: давно
+    не запрошенные файлы вытесняются, а файлы больше лимита читаются с
+    диска на каждый запрос.
+    """
+
+    def __init__(self):
+        # name -> (варианты, заголовки, размер), по давности запроса
+        self.files = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.immutable = None
+
+    def match(self, path):
+        return path.startswith(settings.STATIC_URL)
+
+    def hashed_names(self):
+        if self.immutable is None:
+            storage = staticfiles_storage
+            manifest = (
+                storage.load_manifest()
+                if hasattr(storage, 'load_manifest') else {}
+            )
+            self.immutable = set(manifest.values())
+        return self.immutable
+
+    def find(self, name):
+        # Хвост URL не должен выводить из STATIC_ROOT и каталогов
+        # finders: /static//etc/hostname, /static/../settings.py.
+        parts = name.replace('\\', '/').split('/')
+        if not name or os.path.isabs(name) or '..' in parts or '' in parts:
+            return None
+        try:
+            if settings.STATIC_ROOT:
+                path = safe_join(settings.STATIC_ROOT, name)
+                if os.path.isfile(path):
+                    return path
+            found = finders.find(name)
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        if found and os.path.isfile(found):
+            return found
+        return None
+
+    def read(self, name):
+        # Сжатые копии отдаются только как вариант исходного файла: сами
+        # по себе они ушли бы с типом исходника и без Content-Encoding.
+        if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+            return None
+        path = self.find(name)
+        if path is None:
+            return None
+        with open(path, 'rb') as static_file:
+            variants = {None: static_file.read()}
+        for coding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                with open(path + suffix, 'rb') as static_file:
+                    variants[coding] = static_file.read()
+        content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        headers = [(b'Content-Type', content_type.encode())]
+        if len(variants) > 1:
+            headers.append((b'Vary', b'Accept-Encoding'))
+        if name in self.hashed_names():
+            headers.append((b'Cache-Control', IMMUTABLE))
+        return variants, headers
+
+    def remember(self, name, variants, headers):
+        size = sum(len(content) for content in variants.values())
+        found = variants, headers, size
+        limit = settings.STATIC_MEMORY_LIMIT
+        if size > limit:
+            return found
+        with self.lock:
+            if name in self.files:
+                return self.files[name]
+            self.files[name] = found
+            self.size += size
+            while self.size > limit:
+                _, (_, _, evicted) = self.files.popitem(last=False)
+                self.size -= evicted
+        return found
+
+    def lookup(self, path, accept_encoding=''):
+        """(содержимое, заголовки) или None, если файла нет."""
+        name = path[len(settings.STATIC_URL):]
+        with self.lock:
+            found = self.files.get(name)
+            if found is not None:
+                self.files.move_to_end(name)
+        if found is None:
+            found = self.read(name)
+            if found is None:
+                return None
+            found = self.remember(name, *found)
+        variants, headers, _ = found
+        accepted = accepted_encodings(accept_encoding)
+        for coding, _ in ENCODINGS:
+            if coding in variants and coding in accepted:
+                content = variants[coding]
+                headers = headers + [(b'Content-Encoding', coding.encode())]
+                break
+        else:
+            content = variants[None]
+        return content, headers + [
+            (b'Content-Length', str(len(content)).encode()),
+        ]
+
+
+class StaticFilesWSGI:
+    """Раздача статики тем же StaticFiles перед WSGI-приложением."""
+
+    def __init__(self, application):
+        self.application = application
+        self.static = StaticFiles()
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if (environ['REQUEST_METHOD'] in ('GET', 'HEAD')
+                and self.static.match(path)):
+            found = self.static.lookup(
+                path, environ.get('HTTP_ACCEPT_ENCODING', '')
+            )
+            if found is not None:
+                content, headers = found
+                start_response('200 OK', [
+                    (name.decode('latin-1'), value.decode('latin-1'))
+                    for name, value in headers
+                ])
+                if environ['REQUEST_METHOD'] == 'HEAD':
+                    return [b'']
+                return [content]
+        return self.application(environ, start_response)
@@ -1,17 +1,849 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from importlib import import_module
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+from . import compression, errors, views
+from .asgi import ASGIHandler
+from .cache import FileBasedCache
+from .auth import user_cache, user_cache_key
+from .compression import accepted_encodings
+from .loaders import minify_html
+from .mail import deliver_outbox
+from .middleware import ReplicaMiddleware
+from .metrics import Counter, Histogram, Registry, registry
+from .models import OutboxEmail
+from .profiling import (SamplingProfiler, background, handle_signal,
+                        register_view, unregister_view)
+from .ratelimit import TokenBucket
+from .routers import ReplicaRouter, use_replica
+from .slow_queries import slow_query_log
+from .staticfiles import StaticFiles, StaticFilesWSGI, purge_css
+from .warmup import PHASES, warm_up
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
 
     def test_error_page(self):
-        """Тест шаблона и статуса несуществующей страницы."""
-        content_data = {
-            '/nonexist-page/': 'core/404.html',
-        }
-        for adress, template in content_data.items():
-            with self.subTest(template=template):
-                response = self.client.get(adress)
-                self.assertTemplateUsed(response, template)
+        """Тест содержимого и статуса несуществующей страницы."""
+        response = self.client.get('/nonexist-page/')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertContains(
+            response, 'Custom 404', status_code=HTTPStatus.NOT_FOUND
+        )
+
+    def test_error_page_prerendered(self):
+        """Страница 404 отдаётся без SQL-запросов и шаблонизатора."""
+        errors.pages.clear()
+        self.client.get('/nonexist-page/')
+        with CaptureQueriesContext(connection) as queries:
+            with mock.patch('core.errors.render_to_string') as render:
+                response = self.client.get('/other-nonexist-page/')
+        self.assertEqual(len(queries), 0)
+        render.assert_not_called()
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_server_error_handler(self):
+        """handler500 отдаёт страницу 500 со статусом 500."""
+        response = views.internal_server_error(RequestFactory().get('/'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.INTERNAL_SERVER_ERROR
+        )
+        self.assertIn('Internal Server Error 500', response.content.decode())
+
+
+def busy_view(stop):
+    register_view('posts:index')
+    try:
+        while not stop.is_set():
+            sum(range(1000))
+    finally:
+        unregister_view()
+
+
+class SamplingProfilerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+        cls.user = User.objects.create_user(username='NotStaff')
+
+    def test_profiler_collects_registered_threads(self):
+        """Профайлер собирает стеки только отмеченных потоков."""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_view, args=(stop,))
+        worker.start()
+        try:
+            time.sleep(0.05)
+            profiler = SamplingProfiler(interval=0.001).run(0.1)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertGreater(profiler.samples, 0)
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('posts:index;'))
+            self.assertIn('busy_view', stack)
+            self.assertGreater(int(count), 0)
+
+    @override_settings(SAMPLING_PROFILER_ENABLED=True)
+    def test_profile_view_staff_only(self):
+        """Профиль запускается и отдаётся только staff-пользователям."""
+        url = reverse('core:sampling_profile') + '?seconds=0.05'
+        client = Client()
+        client.force_login(self.user)
+        self.assertEqual(client.post(url).status_code, HTTPStatus.FOUND)
+        client.force_login(self.staff)
+        self.assertEqual(client.post(url).status_code, HTTPStatus.ACCEPTED)
+        background.wait()
+        response = client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        self.assertIn('не обслуживал', response.content.decode())
+
+    @override_settings(SAMPLING_PROFILER_ENABLED=True)
+    def test_background_run_collected_later(self):
+        """Прогон идёт в фоне, пока поток обслуживает view, а файл
+        забирается следующим запросом."""
+        client = Client()
+        client.force_login(self.staff)
+        url = reverse('core:sampling_profile')
+        stop = threading.Event()
+        self.assertEqual(
+            client.post(url + '?seconds=0.2').status_code,
+            HTTPStatus.ACCEPTED,
+        )
+        self.assertEqual(
+            client.post(url + '?seconds=0.2').status_code,
+            HTTPStatus.CONFLICT,
+        )
+        timer = threading.Timer(0.4, stop.set)
+        timer.start()
+        busy_view(stop)
+        background.wait()
+        response = client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertIn('busy_view', response.content.decode())
+
+    def test_signal_dumps_profile(self):
+        """По сигналу профиль пишется в файл."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        stop = threading.Event()
+        with override_settings(
+                SAMPLING_PROFILER_DUMP_DIR=directory,
+                SAMPLING_PROFILER_SIGNAL_SECONDS=0.2):
+            handle_signal(signal.SIGUSR2, None)
+            timer = threading.Timer(0.4, stop.set)
+            timer.start()
+            busy_view(stop)
+            background.wait()
+        dumps = os.listdir(directory)
+        self.assertEqual(len(dumps), 1)
+        with open(os.path.join(directory, dumps[0])) as dump_file:
+            self.assertIn('busy_view', dump_file.read())
+
+    def test_profile_view_disabled(self):
+        """Без SAMPLING_PROFILER_ENABLED профайлер недоступен."""
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(reverse('core:sampling_profile'))
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+@override_settings(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD=0)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=cls.staff, group=cls.group, text='Пост')
+
+    def setUp(self):
+        slow_query_log.clear()
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def test_queries_recorded_with_view_and_plan(self):
+        """Запросы view записываются вместе с view, шаблоном и планом."""
+        self.client.get(reverse('posts:group_list', args=[self.group.slug]))
+        entries = [
+            entry for entry in slow_query_log.top()
+            if entry['view'] == 'posts:group_list'
+        ]
+        self.assertTrue(entries)
+        post_query = next(
+            entry for entry in entries
+            if 'FROM "posts_post"' in entry['sql']
+            and 'COUNT' not in entry['sql']
+        )
+        self.assertTrue(post_query['plan'])
+        self.assertEqual(post_query['count'], 1)
+        template_queries = [entry for entry in entries if entry['template']]
+        self.assertTrue(template_queries)
+
+    def test_admin_page(self):
+        """Журнал доступен staff на странице в стиле админки."""
+        self.client.get(reverse('posts:group_list', args=[self.group.slug]))
+        response = self.client.get(reverse('core:slow_queries'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, 'core/slow_queries.html')
+        self.assertTrue(response.context['entries'])
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Metrics')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_metrics_exposition(self):
+        """/metrics отдаёт счётчики view, кэша и SQL."""
+        client = Client()
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+        response = client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index",method="GET",'
+            'status="200"}', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"}', text
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{cache="page",result="hit"}', text
+        )
+        self.assertIn('yatube_db_queries_total{alias="default"}', text)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_metrics_disabled(self):
+        """Без METRICS_ENABLED эндпоинт не отвечает."""
+        response = Client().get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Бакеты гистограммы накопительные, есть _sum и _count."""
+        histogram = Histogram('test_seconds', 'Тест.', buckets=(1, 2))
+        lines = list(histogram.render({
+            ((), 0): 1, ((), 1): 2, ((), 2): 1,
+            ((), 'sum'): 7.5, ((), 'count'): 4,
+        }))
+        self.assertEqual(lines, [
+            'test_seconds_bucket{le="1"} 1',
+            'test_seconds_bucket{le="2"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 7.5',
+            'test_seconds_count 4',
+        ])
+
+    def test_thread_shards_are_summed(self):
+        """Значения, записанные разными потоками, суммируются."""
+        counter = Counter('test_total', 'Тест.', ('kind',))
+        threads = [
+            threading.Thread(target=counter.inc, args=('a',))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            registry.local_samples()[('test_total', ('a',), '')], 4
+        )
+
+    def test_dead_thread_shards_folded(self):
+        """Шарды завершившихся потоков не копятся, их значения
+        сохраняются."""
+        own = Registry()
+
+        def work():
+            own.shard()[('test_total', (), '')] += 1
+
+        for _ in range(10):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        self.assertEqual(own.local_samples()[('test_total', (), '')], 10)
+        self.assertEqual(own.shards, [])
+        work()
+        self.assertEqual(own.local_samples()[('test_total', (), '')], 11)
+        self.assertEqual(len(own.shards), 1)
+
+    def test_multiprocess_files_are_merged(self):
+        """В multiprocess-режиме суммируются файлы других процессов."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'metrics-1.json'), 'w') as file:
+            json.dump([['yatube_db_queries_total', ['other'], '', 5]], file)
+        with override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            own = Registry()
+            own.flush()
+            samples = own.samples()
+            self.assertTrue(os.path.exists(own._path(os.getpid())))
+        self.assertEqual(
+            samples[('yatube_db_queries_total', ('other',), '')], 5
+        )
+
+
+class SqliteProfileTest(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        """PRAGMA профиля SQLITE_PRAGMAS применены к соединению."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.addCleanup(use_replica, False)
+
+    def route(self, request, view_name):
+        """Прогоняет запрос через ReplicaMiddleware, возвращает базу чтения."""
+        routed = {}
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            routed['db'] = self.router.db_for_read(Post)
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        request.resolver_match = type(
+            'Match', (), {'view_name': view_name}
+        )
+        response = middleware(request)
+        return routed['db'], response
+
+    def test_reads_outside_request_use_primary(self):
+        """Вне запросов чтения идут в основную базу."""
+        self.assertIsNone(self.router.db_for_read(Post))
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_feed_reads_go_to_replica(self):
+        """GET лент читает с реплики, другие view с основной базы."""
+        db, _ = self.route(self.factory.get('/'), 'posts:index')
+        self.assertEqual(db, 'replica')
+        db, _ = self.route(self.factory.get('/'), 'posts:post_detail')
+        self.assertIsNone(db)
+        db, _ = self.route(self.factory.post('/'), 'posts:index')
+        self.assertIsNone(db)
+
+    def test_sessions_and_users_read_from_primary(self):
+        """Сессии и пользователи не читаются с реплики даже в лентах."""
+        use_replica(True)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertIsNone(self.router.db_for_read(Session))
+
+    def test_write_pins_primary(self):
+        """После записи чтения идут в основную базу и ставится cookie."""
+        use_replica(True)
+        self.router.db_for_write(Post)
+        self.assertIsNone(self.router.db_for_read(Post))
+
+        def get_response(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        request = self.factory.post('/')
+        response = ReplicaMiddleware(get_response)(request)
+        self.assertIn('db_pin', response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES['db_pin'] = '1'
+        db, _ = self.route(request, 'posts:index')
+        self.assertIsNone(db)
+
+
+class ASGIHandlerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.handler = ASGIHandler()
+        self.addCleanup(self.handler.executor.shutdown)
+        self.wsgi_calls = 0
+        call_wsgi = self.handler.call_wsgi
+
+        def counting_call_wsgi(environ):
+            self.wsgi_calls += 1
+            return call_wsgi(environ)
+
+        self.handler.call_wsgi = counting_call_wsgi
+
+    def request(self, path, method='GET'):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.handler(scope, receive, send))
+        return messages[0]['status'], messages[1]['body']
+
+    def test_view_runs_in_thread_pool(self):
+        """Обычные view выполняются через WSGIHandler в пуле потоков."""
+        status, body = self.request(reverse('about:author'))
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(self.wsgi_calls, 1)
+
+    def test_static_served_on_event_loop(self):
+        """Статика отдаётся без пула потоков."""
+        status, body = self.request('/static/img/logo.png')
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertTrue(body.startswith(b'\x89PNG'))
+        self.assertEqual(self.wsgi_calls, 0)
+
+    def test_cached_page_served_on_event_loop(self):
+        """Страница из кэша cache_page отдаётся без пула потоков."""
+        user = User.objects.create_user(username='Cached')
+        Post.objects.create(author=user, text='Пост в кэше')
+        expected = self.client.get(reverse('posts:index')).content
+        status, body = self.request(reverse('posts:index'))
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(body, expected)
+        self.assertEqual(self.wsgi_calls, 0)
+
+    def test_head_has_no_body(self):
+        """На HEAD статика, страница из кэша и view отвечают без тела."""
+        self.client.get(reverse('posts:index'))
+        for path in (
+            '/static/img/logo.png',
+            reverse('posts:index'),
+            reverse('about:author'),
+        ):
+            with self.subTest(path=path):
+                status, body = self.request(path, 'HEAD')
+                self.assertEqual(status, HTTPStatus.OK)
+                self.assertEqual(body, b'')
+        self.assertEqual(self.wsgi_calls, 1)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_QUEUE_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_QUEUE_WORKER_THREAD=False,
+)
+class QueuedEmailTest(TestCase):
+    def test_password_reset_is_queued(self):
+        """Письмо сброса пароля ставится в очередь, а не отправляется."""
+        User.objects.create_user(
+            username='Mail', email='mail@example.com', password='Pass-1234'
+        )
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'mail@example.com'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertEqual(deliver_outbox(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['mail@example.com'])
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_failed_delivery_is_retried_later(self):
+        """Неотправленное письмо остаётся в очереди с отложенной попыткой."""
+        mail.send_mail('Тема', 'Текст', 'from@example.com', ['to@ex.com'])
+        backend = 'core.tests.FailingEmailBackend'
+        with override_settings(EMAIL_QUEUE_BACKEND=backend):
+            self.assertEqual(deliver_outbox(), 0)
+        row = OutboxEmail.objects.get()
+        self.assertEqual(row.attempts, 1)
+        self.assertIn('SMTP недоступен', row.last_error)
+        self.assertEqual(deliver_outbox(), 0)
+        OutboxEmail.objects.update(next_attempt=row.created)
+        self.assertEqual(deliver_outbox(), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+
+
+class SessionUserCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Cached')
+
+    def setUp(self):
+        cache.clear()
+        user_cache().clear()
+
+    def count_queries(self):
+        """Число запросов второго (прогретого) запроса к follow_index."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:follow_index')
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        return len(context)
+
+    def test_authenticated_request_saves_two_queries(self):
+        """Сессия и пользователь берутся из кэша: на два запроса меньше."""
+        with override_settings(
+            SESSION_ENGINE='django.contrib.sessions.backends.db',
+            AUTHENTICATION_BACKENDS=[
+                'django.contrib.auth.backends.ModelBackend'
+            ],
+        ):
+            uncached = self.count_queries()
+        self.assertEqual(uncached - self.count_queries(), 2)
+
+    def test_user_save_invalidates_cache(self):
+        """Сохранение пользователя сбрасывает его запись в кэше."""
+        user_cache().set(user_cache_key(self.user.pk), self.user)
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        self.assertIsNone(user_cache().get(user_cache_key(self.user.pk)))
+
+    def test_logout_and_password_change_seen_by_other_processes(self):
+        """Выход и смена пароля видны кэшу другого процесса."""
+        other_process = FileBasedCache(
+            settings.CACHES['shared']['LOCATION'], {}
+        )
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse('posts:follow_index'))
+        session_key = client.session.session_key
+        session_cache_key = f'django.contrib.sessions.cached_db{session_key}'
+        self.assertIsNotNone(other_process.get(session_cache_key))
+        self.assertIsNotNone(
+            other_process.get(user_cache_key(self.user.pk))
+        )
+        self.user.set_password('New-pass-1234')
+        self.user.save()
+        self.assertIsNone(other_process.get(user_cache_key(self.user.pk)))
+        client.logout()
+        self.assertIsNone(other_process.get(session_cache_key))
+
+
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Limited')
+        cls.other = User.objects.create_user(username='Other')
+        cls.author = User.objects.create_user(username='Author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_token_bucket_refills(self):
+        """Корзина пропускает ёмкость, затем по токену за интервал."""
+        bucket = TokenBucket('test', '2/m')
+        self.assertEqual(bucket.consume(now=100), 0)
+        self.assertEqual(bucket.consume(now=100), 0)
+        self.assertAlmostEqual(bucket.consume(now=100), 30)
+        self.assertAlmostEqual(bucket.consume(now=110), 20)
+        self.assertEqual(bucket.consume(now=130), 0)
+        self.assertGreater(bucket.consume(now=130), 0)
+
+    @override_settings(RATE_LIMITS={
+        'posts:profile_follow': {'user': '2/m', 'ip': '4/m'},
+    })
+    def test_limits_per_user_and_ip(self):
+        """Сверх лимита пользователя или IP view отвечает 429."""
+        url = reverse('posts:profile_follow', args=[self.author.username])
+        client = Client()
+        client.force_login(self.user)
+        for _ in range(2):
+            self.assertEqual(client.get(url).status_code, HTTPStatus.FOUND)
+        response = client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        other_client = Client()
+        other_client.force_login(self.other)
+        self.assertEqual(
+            other_client.get(url).status_code, HTTPStatus.FOUND
+        )
+        self.assertEqual(
+            other_client.get(url).status_code,
+            HTTPStatus.TOO_MANY_REQUESTS
+        )
+
+    @override_settings(RATE_LIMITS={
+        'users:login': {'methods': ('POST',), 'ip': '1/m'},
+    })
+    def test_limit_applies_to_listed_methods(self):
+        """Лимит логина действует только на POST."""
+        url = reverse('users:login')
+        data = {'username': 'Limited', 'password': 'wrong'}
+        self.assertEqual(self.client.post(url, data).status_code,
+                         HTTPStatus.OK)
+        self.assertEqual(self.client.post(url, data).status_code,
+                         HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+
+
+class WarmUpTest(TestCase):
+    def test_warm_up_reports_all_phases(self):
+        """warm_up() выполняет все фазы и компилирует шаблоны проекта."""
+        report = warm_up()
+        self.assertEqual(list(report), list(PHASES))
+        templates, _ = report['templates']
+        self.assertGreater(templates, 0)
+        for _, elapsed in report.values():
+            self.assertGreaterEqual(elapsed, 0)
+
+
+class ProductionSettingsTest(TestCase):
+    def test_debug_toolbar_disabled_by_default(self):
+        """Без DEBUG_TOOLBAR debug_toolbar не загружается."""
+        self.assertFalse(settings.DEBUG_TOOLBAR)
+        self.assertNotIn('debug_toolbar', settings.INSTALLED_APPS)
+        self.assertNotIn(
+            'debug_toolbar.middleware.DebugToolbarMiddleware',
+            settings.MIDDLEWARE,
+        )
+
+    def test_admin_models_registered_by_urlconf(self):
+        """Модели регистрируются в админке при загрузке URLconf."""
+        import_module(settings.ROOT_URLCONF)
+        self.assertTrue(admin.site.is_registered(Post))
+
+
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            STATIC_ROOT=cls.static_root, STATIC_PURGE_CSS=True
+        )
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_purge_css_keeps_used_selectors(self):
+        """Из CSS удаляются селекторы с неиспользуемыми классами."""
+        css = (
+            '/*! лицензия */.card,.toast{color:red}.toast{margin:0}'
+            'a:not(.btn){color:blue}'
+            '@media (min-width:576px){.toast{width:1px}}'
+            '@font-face{font-family:x}'
+        )
+        self.assertEqual(
+            purge_css(css, {'card', 'btn'}),
+            '/*! лицензия */.card{color:red}a:not(.btn){color:blue}'
+            '@font-face{font-family:x}'
+        )
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic пишет файлы с хэшем и сжатые копии."""
+        url = static('css/bootstrap.min.css')
+        self.assertRegex(url, r'^/static/css/bootstrap\.min\.\w{12}\.css$')
+        path = os.path.join(self.static_root, url[len('/static/'):])
+        self.assertTrue(os.path.isfile(path + '.gz'))
+        source = os.path.join(
+            settings.BASE_DIR, 'static', 'css', 'bootstrap.min.css'
+        )
+        self.assertLess(os.path.getsize(path), os.path.getsize(source))
+
+    def test_hashed_file_served_compressed_and_immutable(self):
+        """Файл с хэшем отдаётся сжатым и с Cache-Control: immutable."""
+        content, headers = StaticFiles().lookup(
+            static('css/bootstrap.min.css'), 'gzip, deflate'
+        )
+        headers = dict(headers)
+        self.assertEqual(headers[b'Content-Encoding'], b'gzip')
+        self.assertIn(b'immutable', headers[b'Cache-Control'])
+        self.assertEqual(
+            headers[b'Content-Length'], str(len(content)).encode()
+        )
+
+    def test_path_traversal_not_served(self):
+        """Абсолютные пути и .. за пределы статики не отдаются."""
+        static_files = StaticFiles()
+        settings_path = os.path.join(
+            settings.BASE_DIR, 'yatube', 'settings.py'
+        )
+        traversal = os.path.relpath(settings_path, self.static_root)
+        for path in (
+            '/static//etc/hostname',
+            '/static/' + settings_path,
+            '/static/' + traversal,
+            '/static/../yatube/settings.py',
+            '/static/css/../../yatube/settings.py',
+            '/static/css/bootstrap.min.css\x00',
+        ):
+            with self.subTest(path=path):
+                self.assertIsNone(static_files.lookup(path))
+        application = StaticFilesWSGI(
+            lambda environ, start_response: [b'not found']
+        )
+        body = application(
+            {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/static//etc/hostname'},
+            None,
+        )
+        self.assertEqual(body, [b'not found'])
+
+    def test_memory_limited(self):
+        """Файлы в памяти не превышают STATIC_MEMORY_LIMIT."""
+        static_files = StaticFiles()
+        paths = ['/static/img/bash.png', '/static/img/css.png']
+        sizes = [len(static_files.lookup(path)[0]) for path in paths]
+        self.assertEqual(static_files.size, sum(sizes))
+        static_files = StaticFiles()
+        with self.settings(STATIC_MEMORY_LIMIT=max(sizes)):
+            for path in paths + paths:
+                self.assertIsNotNone(static_files.lookup(path))
+                self.assertLessEqual(static_files.size, max(sizes))
+            self.assertEqual(len(static_files.files), 1)
+        with self.settings(STATIC_MEMORY_LIMIT=0):
+            static_files = StaticFiles()
+            content, _ = static_files.lookup(paths[0])
+            self.assertEqual(len(content), sizes[0])
+            self.assertEqual(static_files.files, {})
+
+    def test_compressed_copies_not_served_directly(self):
+        """Файлы .gz и .br не отдаются по собственному имени."""
+        url = static('css/bootstrap.min.css')
+        path = os.path.join(self.static_root, url[len('/static/'):])
+        self.assertTrue(os.path.isfile(path + '.gz'))
+        static_files = StaticFiles()
+        for suffix in ('.gz', '.br'):
+            with self.subTest(suffix=suffix):
+                self.assertIsNone(static_files.lookup(url + suffix))
+        self.assertIsNotNone(static_files.lookup(url))
+
+    def test_unhashed_file_not_immutable(self):
+        """Файл без хэша в имени не кэшируется навсегда."""
+        content, headers = StaticFiles().lookup(
+            '/static/css/bootstrap.min.css', 'gzip;q=0'
+        )
+        headers = dict(headers)
+        self.assertNotIn(b'Cache-Control', headers)
+        self.assertNotIn(b'Content-Encoding', headers)
+
+
+class CompressionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory(HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+    def test_page_compressed_once(self):
+        """Страница cache_page сжимается один раз, дальше тело из кэша."""
+        with mock.patch(
+            'core.compression.encode', wraps=compression.encode
+        ) as encode:
+            first = self.client.get(
+                reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+            )
+            second = self.client.get(
+                reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+            )
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', first['Vary'])
+        self.assertEqual(first.content, second.content)
+        plain = self.client.get(reverse('posts:index'))
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(gzip.decompress(first.content), plain.content)
+
+    def test_small_response_not_compressed(self):
+        """Ответы короче COMPRESS_MIN_SIZE не сжимаются."""
+        response = compression.compress_response(
+            self.factory.get('/'), HttpResponse('коротко')
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_encoded_response_not_compressed(self):
+        """Уже сжатый ответ не сжимается повторно."""
+        response = HttpResponse(b'x' * 4096)
+        response['Content-Encoding'] = 'br'
+        compression.compress_response(self.factory.get('/'), response)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(response.content), 4096)
+
+    def test_accepted_encodings(self):
+        """q=0 исключает кодировку из Accept-Encoding."""
+        self.assertEqual(
+            accepted_encodings('br;q=0, GZIP;q=0.5, identity'),
+            {'gzip', 'identity'}
+        )
+
+
+class MinifyLoaderTest(TestCase):
+    def test_minify_html(self):
+        """Пробелы сжимаются, кроме <pre>, <textarea> и тегов шаблона."""
+        source = (
+            '<ul>\n    <li>  {{ post.text }}  </li>\n</ul>\n'
+            '<pre>\n  код\n</pre>\n  <textarea>  a\n  b</textarea>\n'
+            '{% trans "два  пробела" %}'
+        )
+        self.assertEqual(
+            minify_html(source),
+            '<ul>\n<li> {{ post.text }} </li>\n</ul>\n'
+            '<pre>\n  код\n</pre>\n<textarea>  a\n  b</textarea>\n'
+            '{% trans "два  пробела" %}'
+        )
+
+    def test_project_templates_minified(self):
+        """Шаблоны проекта рендерятся без отступов."""
+        response = self.client.get(reverse('about:author'))
+        self.assertIn(
+            b'<ul class="nav nav-pills">\n<li class="nav-item">',
+            response.content
+        )
@@ -0,0 +1,19 @@
+import time
+
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .metrics import thumbnail_duration
+
+
+class MetricsThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, замеряющий время генерации миниатюр."""
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        start = time.perf_counter()
+        try:
+            return super()._create_thumbnail(
+                source_image, geometry_string, options, thumbnail
+            )
+        finally:
+            thumbnail_duration.observe(time.perf_counter() - start)
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('metrics', views.metrics, name='metrics'),
+    path(
+        'debug/profile/',
+        views.sampling_profile,
+        name='sampling_profile'
+    ),
+    path(
+        'debug/slow-queries/',
+        views.slow_queries,
+        name='slow_queries'
+    ),
+]
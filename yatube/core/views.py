@@ -1,135 +1,92 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
-
-def page_not_found(request, exception):
-    return render(
-        request, 'core/404.html', {'path': request.path},
-        status=HTTPStatus.NOT_FOUND.value
-    )
-
-
-def csrf_failure(request, reason=''):
-    return render(request, 'core/403csrf.html')
-
-
-def internal_server_error(request, reason=''):
-    context = {
-        'status': HTTPStatus.INTERNAL_SERVER_ERROR.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.INTERNAL_SERVER_ERROR.value
-    )
-
-
-def not_implemented(request, exception):
-    context = {
-        'status': HTTPStatus.NOT_IMPLEMENTED.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.NOT_IMPLEMENTED.value
-    )
-
-
-def bad_gateway(request, exception):
-    context = {
-        'status': HTTPStatus.BAD_GATEWAY.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.BAD_GATEWAY.value
-    )
-
-
-def service_unavailable(request, exception):
-    context = {
-        'status': HTTPStatus.SERVICE_UNAVAILABLE.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.SERVICE_UNAVAILABLE.value
-    )
-
-
-def gateway_timeout(request, exception):
-    context = {
-        'status': HTTPStatus.GATEWAY_TIMEOUT.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.GATEWAY_TIMEOUT.value
+from .errors import error_view
+from .metrics import registry
+from .profiling import background
+from .slow_queries import slow_query_log
+
+
+page_not_found = error_view(HTTPStatus.NOT_FOUND)
+csrf_failure = error_view(HTTPStatus.FORBIDDEN)
+internal_server_error = error_view(HTTPStatus.INTERNAL_SERVER_ERROR)
+not_implemented = error_view(HTTPStatus.NOT_IMPLEMENTED)
+bad_gateway = error_view(HTTPStatus.BAD_GATEWAY)
+service_unavailable = error_view(HTTPStatus.SERVICE_UNAVAILABLE)
+gateway_timeout = error_view(HTTPStatus.GATEWAY_TIMEOUT)
+http_version_not_supported = error_view(
+    HTTPStatus.HTTP_VERSION_NOT_SUPPORTED
+)
+variant_also_negotiates = error_view(HTTPStatus.VARIANT_ALSO_NEGOTIATES)
+insufficient_storage = error_view(HTTPStatus.INSUFFICIENT_STORAGE)
+loop_detected = error_view(HTTPStatus.LOOP_DETECTED)
+not_extended = error_view(HTTPStatus.NOT_EXTENDED)
+network_authentication_required = error_view(
+    HTTPStatus.NETWORK_AUTHENTICATION_REQUIRED
+)
+
+
+@staff_member_required
+def sampling_profile(request):
+    """POST ?seconds=N запускает фоновый прогон профайлера по view
+    приложения posts, GET отдаёт collapsed-stack файл последнего."""
+    if not settings.SAMPLING_PROFILER_ENABLED:
+        raise Http404
+    if request.method == 'POST':
+        try:
+            seconds = float(request.GET.get('seconds', 10))
+        except ValueError:
+            return HttpResponse(status=HTTPStatus.BAD_REQUEST.value)
+        seconds = min(
+            max(seconds, 0), settings.SAMPLING_PROFILER_MAX_SECONDS
+        )
+        if not background.start(seconds):
+            return HttpResponse(status=HTTPStatus.CONFLICT.value)
+        return HttpResponse(status=HTTPStatus.ACCEPTED.value)
+    if background.running:
+        return HttpResponse(status=HTTPStatus.ACCEPTED.value)
+    profiler = background.last
+    if profiler is None:
+        raise Http404
+    if not profiler.stacks:
+        return HttpResponse(
+            'За время прогона процесс не обслуживал view posts.',
+            status=HTTPStatus.CONFLICT.value,
+            content_type='text/plain; charset=utf-8',
+        )
+    response = HttpResponse(
+        profiler.collapsed(), content_type='text/plain; charset=utf-8'
     )
-
-
-def http_version_not_supported(request, exception):
-    context = {
-        'status': HTTPStatus.HTTP_VERSION_NOT_SUPPORTED.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.HTTP_VERSION_NOT_SUPPORTED.value
+    response['Content-Disposition'] = (
+        'attachment; filename="posts-profile.folded"'
     )
+    response['X-Profiler-Samples'] = profiler.samples
+    return response
 
 
-def variant_also_negotiates(request, exception):
+@staff_member_required
+def slow_queries(request):
+    """Журнал медленных запросов в интерфейсе админки."""
+    if request.method == 'POST':
+        slow_query_log.clear()
     context = {
-        'status': HTTPStatus.VARIANT_ALSO_NEGOTIATES.value
+        'title': 'Медленные запросы',
+        'entries': slow_query_log.top(),
+        'enabled': settings.SLOW_QUERY_LOG_ENABLED,
+        'threshold': settings.SLOW_QUERY_THRESHOLD,
     }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.VARIANT_ALSO_NEGOTIATES.value
-    )
-
-
-def insufficient_storage(request, exception):
-    context = {
-        'status': HTTPStatus.INSUFFICIENT_STORAGE.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.INSUFFICIENT_STORAGE.value
-    )
+    return render(request, 'core/slow_queries.html', context)
 
 
-def loop_detected(request, exception):
-    context = {
-        'status': HTTPStatus.LOOP_DETECTED.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.LOOP_DETECTED.value
-    )
-
-
-def not_extended(request, exception):
-    context = {
-        'status': HTTPStatus.NOT_EXTENDED.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.NOT_EXTENDED.value
-    )
-
-
-def network_authentication_required(request, exception):
-    context = {
-        'status': HTTPStatus.NETWORK_AUTHENTICATION_REQUIRED.value
-    }
-    return render(
-        request, 'core/5xx_server_error.html',
-        context, {'path': request.path},
-        status=HTTPStatus.NETWORK_AUTHENTICATION_REQUIRED.value
+def metrics(request):
+    """Метрики процесса (или всех процессов) в формате Prometheus."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        registry.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
     )
@@ -0,0 +1,97 @@
+"""Прогрев воркера до первого запроса.
+
+Без прогрева первый запрос каждого воркера компилирует base.html,
+header.html, post_card.html, paginator.html и другие шаблоны с диска,
+строит URLconf, загружает каталоги переводов и список паролей
+CommonPasswordValidator. warm_up() делает всё это заранее.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.password_validation import (
+    get_default_password_validators)
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+from django.utils import translation
+
+from .errors import render_pages
+
+logger = logging.getLogger(__name__)
+
+
+def project_template_dirs(engine):
+    """Каталоги шаблонов проекта, без шаблонов Django и сторонних пакетов."""
+    dirs = list(engine.engine.dirs) + list(get_app_template_dirs('templates'))
+    return [
+        directory for directory in dirs
+        if os.path.abspath(directory).startswith(settings.BASE_DIR)
+    ]
+
+
+def compile_templates():
+    """Компилирует шаблоны проекта в кэш cached.Loader."""
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in project_template_dirs(engine):
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if not filename.endswith(('.html', '.txt')):
+                        continue
+                    name = os.path.relpath(
+                        os.path.join(root, filename), directory
+                    ).replace(os.sep, '/')
+                    try:
+                        engine.get_template(name)
+                    except TemplateSyntaxError:
+                        logger.exception('Шаблон %s не скомпилирован', name)
+                    else:
+                        count += 1
+    return count
+
+
+def resolve_urls():
+    return len(get_resolver().reverse_dict)
+
+
+def load_translations():
+    for language in {settings.LANGUAGE_CODE, 'ru'}:
+        with translation.override(language):
+            translation.gettext('Password')
+    return settings.LANGUAGE_CODE
+
+
+def prime_password_validators():
+    return len(get_default_password_validators())
+
+
+PHASES = OrderedDict([
+    ('templates', compile_templates),
+    ('error_pages', render_pages),
+    ('urls', resolve_urls),
+    ('translations', load_translations),
+    ('password_validators', prime_password_validators),
+])
+
+
+def warm_up():
+    """Выполняет все фазы прогрева, возвращает {фаза: (результат, сек)}."""
+    report = OrderedDict()
+    for name, phase in PHASES.items():
+        start = time.perf_counter()
+        result = phase()
+        report[name] = (result, time.perf_counter() - start)
+    logger.info(
+        'Прогрев воркера: %s',
+        ', '.join(
+            f'{name}={result} за {elapsed * 1000:.1f} мс'
+            for name, (result, elapsed) in report.items()
+        )
+    )
+    return report
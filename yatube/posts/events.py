@@ -0,0 +1,199 @@
+"""Server-Sent Events о новых постах для лент index, group_list и follow.
+
+Подписчики - это asyncio-очереди в цикле событий core.asgi, поэтому
+тысячи простаивающих соединений не занимают потоков. Публикация
+происходит в потоке view (сигнал post_save) и передаётся в цикл через
+call_soon_threadsafe. Брокер живёт внутри процесса: клиент получает
+события о постах, созданных в том же процессе.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db import close_old_connections
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+from .following import following_ids
+
+INDEX_CHANNEL: str = 'index'
+
+
+def group_channel(slug):
+    return f'group:{slug}'
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+class Subscription:
+    def __init__(self, channels, loop):
+        self.channels = channels
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.SSE_QUEUE_SIZE)
+
+    def put(self, message):
+        # Медленный клиент теряет самые новые события, а не память сервера.
+        if not self.queue.full():
+            self.queue.put_nowait(message)
+
+
+class Broker:
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, asyncio.get_event_loop())
+        with self.lock:
+            for channel in channels:
+                self.subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers[channel].discard(subscription)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+
+    def has_subscribers(self, channels):
+        return any(channel in self.subscribers for channel in channels)
+
+    def publish(self, channels, message):
+        with self.lock:
+            targets = set().union(*(
+                self.subscribers.get(channel, ()) for channel in channels
+            ))
+        for subscription in targets:
+            subscription.loop.call_soon_threadsafe(subscription.put, message)
+
+
+broker = Broker()
+
+
+def post_channels(post):
+    channels = [INDEX_CHANNEL, author_channel(post.author_id)]
+    if post.group_id:
+        channels.append(group_channel(post.group.slug))
+    return channels
+
+
+def publish_post(post):
+    """Рассылает подписчикам id поста и отрендеренную карточку."""
+    channels = post_channels(post)
+    if not broker.has_subscribers(channels):
+        return
+    message = json.dumps({
+        'id': post.pk,
+        'html': render_to_string('includes/post_card.html', {'post': post}),
+    })
+    broker.publish(
+        channels, f'id: {post.pk}\nevent: post\ndata: {message}\n\n'
+    )
+
+
+def follow_channels(session_key):
+    """Каналы авторов, на которых подписан владелец сессии."""
+    try:
+        store = import_string(settings.SESSION_ENGINE).SessionStore
+        session = store(session_key)
+        user_id = session.get(SESSION_KEY) if session_key else None
+        if user_id is None:
+            return None
+        return [
+            author_channel(author_id)
+            for author_id in following_ids(user_id)
+        ]
+    finally:
+        close_old_connections()
+
+
+async def resolve_channels(scope):
+    parts = scope['path'][len(settings.SSE_URL):].strip('/').split('/')
+    if parts == [INDEX_CHANNEL]:
+        return [INDEX_CHANNEL]
+    if len(parts) == 2 and parts[0] == 'group':
+        return [group_channel(parts[1])]
+    if parts == ['follow']:
+        session_key = cookie_value(scope, settings.SESSION_COOKIE_NAME)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, follow_channels, session_key
+        )
+    return None
+
+
+def cookie_value(scope, name):
+    for header, value in scope.get('headers', []):
+        if header != b'cookie':
+            continue
+        for pair in value.decode('latin-1').split(';'):
+            key, _, cookie = pair.strip().partition('=')
+            if key == name:
+                return cookie
+    return None
+
+
+async def wait_for_disconnect(receive):
+    """Дочитывает тело запроса (http.request) и ждёт http.disconnect."""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def stream(scope, receive, send):
+    """ASGI-обработчик SSE_URL: index/, group/<slug>/ и follow/."""
+    channels = await resolve_channels(scope)
+    if channels is None:
+        await send({
+            'type': 'http.response.start',
+            'status': 404,
+            'headers': [(b'Content-Type', b'text/plain')],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    subscription = broker.subscribe(channels)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'Content-Type', b'text/event-stream'),
+                (b'Cache-Control', b'no-cache'),
+                (b'X-Accel-Buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': b': connected\n\n',
+            'more_body': True,
+        })
+        while True:
+            message = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {message, disconnect},
+                timeout=settings.SSE_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                message.cancel()
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            body = message.result() if message in done else ': ping\n\n'
+            if message not in done:
+                message.cancel()
+            await send({
+                'type': 'http.response.body',
+                'body': body.encode(),
+                'more_body': True,
+            })
+    finally:
+        disconnect.cancel()
+        broker.unsubscribe(subscription)
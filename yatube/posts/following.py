@@ -0,0 +1,157 @@
+"""Множество авторов, на которых подписан пользователь.
+
+id авторов хранятся в кэше FOLLOWING_CACHE_ALIAS отсортированным
+array('I') - 4 байта на подписку - и загружаются из Follow один раз.
+Кэш общий для процессов, потому что при подписке и отписке сигналы
+posts.signals стирают запись только там, сразу и после коммита: с
+процессным кэшем другие воркеры показывали бы старую кнопку
+«Подписаться» до FOLLOWING_CACHE_TIMEOUT. Правка
+массива на месте (get, insort, set) теряла id при двух одновременных
+подписках и оставляла в кэше подписку из откатившейся транзакции.
+В запросе массив превращается в frozenset, и is_following() - это O(1).
+
+follow_many() и unfollow_many() подписывают и отписывают от многих
+авторов сразу: имена ищутся одним запросом, а строки Follow
+вставляются и удаляются одним запросом. Кэш подписок, граф posts.graph
+и рекомендации меняются после коммита, и рекомендации пересчитываются
+один раз на всю пачку.
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .graph import graph
+from .models import Follow, User
+from .recommendations import follow_changed
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def following_cache():
+    return caches[settings.FOLLOWING_CACHE_ALIAS]
+
+
+class FollowingSet:
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = frozenset(ids)
+
+    def is_following(self, author_id):
+        return author_id in self.ids
+
+    __contains__ = is_following
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+
+def following_ids(user_id):
+    """Отсортированный array('I') id авторов пользователя."""
+    ids = following_cache().get(following_key(user_id))
+    if ids is None:
+        ids = array('I', sorted(
+            Follow.objects.filter(
+                user_id=user_id
+            ).values_list('author_id', flat=True)
+        ))
+        following_cache().set(
+            following_key(user_id), ids, settings.FOLLOWING_CACHE_TIMEOUT
+        )
+    return ids
+
+
+def following_set(user):
+    """FollowingSet пользователя, один на объект user в запросе."""
+    if not user.is_authenticated:
+        return FollowingSet()
+    try:
+        return user._following_set
+    except AttributeError:
+        user._following_set = FollowingSet(following_ids(user.pk))
+        return user._following_set
+
+
+def forget_following(user_id):
+    following_cache().delete(following_key(user_id))
+
+
+def clear_following_cache(user_id):
+    """Как clear_lookup_cache: сразу и ещё раз после коммита."""
+    forget_following(user_id)
+    transaction.on_commit(lambda: forget_following(user_id))
+
+
+def resolve_usernames(user, usernames):
+    """{username: id} найденных авторов, кроме самого user, и список
+    ненайденных имён в порядке запроса."""
+    usernames = list(dict.fromkeys(usernames))
+    ids = dict(
+        User.objects.filter(username__in=usernames).values_list(
+            'username', 'pk'
+        )
+    )
+    found = {
+        name: ids[name] for name in usernames
+        if name in ids and name != user.username
+    }
+    missing = [name for name in usernames if name not in ids]
+    return found, missing
+
+
+def add_edges(user_id, author_ids):
+    for author_id in author_ids:
+        graph.add(user_id, author_id)
+
+
+def follow_many(user, usernames):
+    """Подписывает user на авторов usernames.
+
+    Возвращает имена новых подписок и имена, которых нет.
+    """
+    found, missing = resolve_usernames(user, usernames)
+    with transaction.atomic():
+        existing = set(Follow.objects.filter(
+            user=user, author_id__in=found.values()
+        ).values_list('author_id', flat=True))
+        added = {
+            name: pk for name, pk in found.items() if pk not in existing
+        }
+        # Параллельная подписка на того же автора упрётся в
+        # unique appversion и будет пропущена.
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=pk) for pk in added.values()],
+            ignore_conflicts=True,
+        )
+        if added:
+            # bulk_create не шлёт post_save: то же, что follow_created,
+            # но один раз на пачку.
+            author_ids = list(added.values())
+            clear_following_cache(user.pk)
+            transaction.on_commit(lambda: add_edges(user.pk, author_ids))
+            follow_changed(user.pk)
+    return list(added), missing
+
+
+def unfollow_many(user, usernames):
+    """Отписывает user от авторов usernames.
+
+    Возвращает имена снятых подписок и имена, которых нет.
+    """
+    found, missing = resolve_usernames(user, usernames)
+    with transaction.atomic():
+        follows = Follow.objects.filter(
+            user=user, author_id__in=found.values()
+        )
+        removed = set(follows.values_list('author_id', flat=True))
+        # Сигналы post_delete стирают кэш и правят граф, а пересчёт
+        # рекомендаций после коммита выполняется один раз.
+        follows.delete()
+    return [name for name, pk in found.items() if pk in removed], missing
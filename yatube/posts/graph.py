@@ -0,0 +1,305 @@
+"""Граф подписок в памяти процесса.
+
+Рёбра Follow хранятся в формате CSR (compressed sparse row): для
+каждого направления массив offsets, где подписки пользователя с id u
+лежат в targets[offsets[u]:offsets[u + 1]] по возрастанию. Оба массива -
+array('I'), то есть 4 байта на ребро и 4 байта на id пользователя,
+вместо сотен байт на строку в множествах Python. Граф строится одним
+проходом по Follow при первом обращении; обратный граф (подписчики)
+получается из прямого сортировкой подсчётом без второго запроса.
+
+Подписки и отписки из сигналов posts.signals попадают в небольшие
+множества добавленных и удалённых рёбер поверх CSR, а когда их
+набирается больше COMPACT_RATIO от числа рёбер, CSR собирается заново
+из памяти. Как и брокер posts.events, граф видит только события своего
+процесса: подписки, сделанные в других воркерах, он узнаёт, только
+перечитав таблицу. Поэтому граф старше FOLLOW_GRAPH_MAX_AGE секунд
+перечитывается при следующем обращении, и ответы воркеров расходятся не
+дольше этого времени. С FOLLOW_GRAPH_MAX_AGE = None граф не
+перечитывается и верен только для одного процесса.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import Follow
+
+# Доля изменений поверх CSR, после которой он собирается заново
+COMPACT_RATIO = 0.1
+COMPACT_MIN = 1024
+
+
+class CSR:
+    """Неизменяемые списки смежности в двух массивах."""
+    __slots__ = ('offsets', 'targets')
+
+    def __init__(self, offsets=None, targets=None):
+        self.offsets = offsets if offsets is not None else array('I', [0])
+        self.targets = targets if targets is not None else array('I')
+
+    @classmethod
+    def from_pairs(cls, pairs, size=0):
+        """CSR из пар (source, target), отсортированных по source."""
+        counts = array('I', bytes(4 * (size + 1)))
+        targets = array('I')
+        for source, target in pairs:
+            if source >= len(counts) - 1:
+                missing = source + 2 - len(counts)
+                counts.extend(array('I', bytes(4 * missing)))
+            counts[source + 1] += 1
+            targets.append(target)
+        for index in range(1, len(counts)):
+            counts[index] += counts[index - 1]
+        return cls(counts, targets)
+
+    def transpose(self):
+        """Обратный граф: сортировка подсчётом по target."""
+        size = len(self.offsets) - 1
+        if self.targets:
+            size = max(size, max(self.targets) + 1)
+        offsets = array('I', bytes(4 * (size + 1)))
+        for target in self.targets:
+            offsets[target + 1] += 1
+        for index in range(1, len(offsets)):
+            offsets[index] += offsets[index - 1]
+        position = array('I', offsets)
+        targets = array('I', bytes(4 * len(self.targets)))
+        # source идут по возрастанию, поэтому строки обратного графа
+        # тоже получаются отсортированными.
+        for source in range(len(self.offsets) - 1):
+            for index in range(self.offsets[source],
+                               self.offsets[source + 1]):
+                target = self.targets[index]
+                targets[position[target]] = source
+                position[target] += 1
+        return CSR(offsets, targets)
+
+    def bounds(self, node):
+        if node + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[node], self.offsets[node + 1]
+
+    def row(self, node):
+        start, end = self.bounds(node)
+        return self.targets[start:end]
+
+    def has(self, node, target):
+        start, end = self.bounds(node)
+        index = bisect_left(self.targets, target, start, end)
+        return index < end and self.targets[index] == target
+
+    def degree(self, node):
+        start, end = self.bounds(node)
+        return end - start
+
+    def nbytes(self):
+        return (
+            self.offsets.itemsize * len(self.offsets)
+            + self.targets.itemsize * len(self.targets)
+        )
+
+
+class Direction:
+    """CSR одного направления и изменения поверх него."""
+
+    def __init__(self, csr):
+        self.csr = csr
+        self.added = defaultdict(set)
+        self.removed = defaultdict(set)
+        self.changes = 0
+
+    def has(self, node, target):
+        if target in self.added.get(node, ()):
+            return True
+        if target in self.removed.get(node, ()):
+            return False
+        return self.csr.has(node, target)
+
+    def row(self, node):
+        row = self.csr.row(node)
+        removed = self.removed.get(node)
+        added = self.added.get(node)
+        if not removed and not added:
+            return row
+        merged = set(row)
+        merged -= removed or set()
+        merged |= added or set()
+        return array('I', sorted(merged))
+
+    def degree(self, node):
+        return (
+            self.csr.degree(node)
+            + len(self.added.get(node, ()))
+            - len(self.removed.get(node, ()))
+        )
+
+    def add(self, node, target):
+        self.changes += 1
+        if target in self.removed.get(node, ()):
+            self.removed[node].discard(target)
+        else:
+            self.added[node].add(target)
+
+    def remove(self, node, target):
+        self.changes += 1
+        if target in self.added.get(node, ()):
+            self.added[node].discard(target)
+        else:
+            self.removed[node].add(target)
+
+    def compact(self):
+        nodes = set(self.added)
+        size = max(len(self.csr.offsets) - 1, max(nodes, default=-1) + 1)
+        self.csr = CSR.from_pairs(
+            ((node, target) for node in range(size)
+             for target in self.row(node)),
+            size,
+        )
+        self.added.clear()
+        self.removed.clear()
+        self.changes = 0
+
+
+class FollowGraph:
+    """Подписки (following) и подписчики (followers) пользователей."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.following_edges = None
+        self.follower_edges = None
+        self.loaded_at = None
+
+    @property
+    def loaded(self):
+        return self.following_edges is not None
+
+    @property
+    def stale(self):
+        """Граф не загружен или старше FOLLOW_GRAPH_MAX_AGE."""
+        max_age = settings.FOLLOW_GRAPH_MAX_AGE
+        return not self.loaded or (
+            max_age is not None
+            and time.monotonic() - self.loaded_at > max_age
+        )
+
+    def load_edges(self, pairs):
+        """Строит граф из пар (user_id, author_id), отсортированных по
+        user_id."""
+        forward = CSR.from_pairs(pairs)
+        with self.lock:
+            self.following_edges = Direction(forward)
+            self.follower_edges = Direction(forward.transpose())
+            self.loaded_at = time.monotonic()
+
+    def reload(self):
+        self.load_edges(
+            Follow.objects.order_by('user_id', 'author_id').values_list(
+                'user_id', 'author_id'
+            ).iterator()
+        )
+
+    def ensure_loaded(self):
+        if self.stale:
+            with self.lock:
+                if self.stale:
+                    self.reload()
+
+    def add(self, user_id, author_id):
+        """Подписка; до первой загрузки графа ничего не делает. Запись
+        не перечитывает устаревший граф: это дело чтений, а не запроса,
+        который подписывает."""
+        with self.lock:
+            if (not self.loaded
+                    or self.following_edges.has(user_id, author_id)):
+                return
+            self.following_edges.add(user_id, author_id)
+            self.follower_edges.add(author_id, user_id)
+            self.compact_if_needed()
+
+    def remove(self, user_id, author_id):
+        with self.lock:
+            if (not self.loaded
+                    or not self.following_edges.has(user_id, author_id)):
+                return
+            self.following_edges.remove(user_id, author_id)
+            self.follower_edges.remove(author_id, user_id)
+            self.compact_if_needed()
+
+    def compact_if_needed(self):
+        edges = len(self.following_edges.csr.targets)
+        if self.following_edges.changes > max(
+                COMPACT_MIN, edges * COMPACT_RATIO):
+            self.following_edges.compact()
+            self.follower_edges.compact()
+
+    def is_following(self, user_id, author_id):
+        self.ensure_loaded()
+        with self.lock:
+            return self.following_edges.has(user_id, author_id)
+
+    def following(self, user_id):
+        """id авторов, на которых подписан пользователь, по возрастанию."""
+        self.ensure_loaded()
+        with self.lock:
+            return self.following_edges.row(user_id)
+
+    def followers(self, user_id):
+        self.ensure_loaded()
+        with self.lock:
+            return self.follower_edges.row(user_id)
+
+    def following_count(self, user_id):
+        self.ensure_loaded()
+        with self.lock:
+            return self.following_edges.degree(user_id)
+
+    def follower_count(self, user_id):
+        self.ensure_loaded()
+        with self.lock:
+            return self.follower_edges.degree(user_id)
+
+    def mutual(self, user_id):
+        """Взаимные подписки: авторы, которые подписаны на пользователя
+        в ответ."""
+        with self.lock:
+            return sorted(
+                set(self.following(user_id)) & set(self.followers(user_id))
+            )
+
+    def common_following(self, user_id, other_id):
+        """Авторы, на которых подписаны оба пользователя."""
+        with self.lock:
+            return sorted(
+                set(self.following(user_id)) & set(self.following(other_id))
+            )
+
+    def reach(self, user_id, hops=2):
+        """Пользователи, до которых не больше hops переходов по
+        подпискам, без самого пользователя."""
+        seen = {user_id}
+        frontier = [user_id]
+        with self.lock:
+            for _ in range(hops):
+                following = set()
+                for node in frontier:
+                    following.update(self.following(node))
+                frontier = following - seen
+                seen |= frontier
+        seen.discard(user_id)
+        return seen
+
+    def nbytes(self):
+        """Память под CSR обоих направлений без изменений поверх него."""
+        self.ensure_loaded()
+        with self.lock:
+            return (
+                self.following_edges.csr.nbytes()
+                + self.follower_edges.csr.nbytes()
+            )
+
+
+graph = FollowGraph()
@@ -0,0 +1,111 @@
+"""Поиск объектов из URL через кэш.
+
+Краулеры перебирают несуществующие /profile/<username>/, /group/<slug>/
+и /posts/<id>/. Промах запоминается в кэше NEGATIVE_CACHE_ALIAS на
+NEGATIVE_CACHE_TIMEOUT секунд, и следующий такой запрос получает 404 без
+SQL. У промахов свой кэш со своим MAX_ENTRIES, чтобы перебор не вытеснял
+из основного кэша страницы и сессии. Группы и пользователи, которые
+меняются редко, кэшируются и при попадании на LOOKUP_CACHE_TIMEOUT
+секунд: страницы группы и профиля обходятся без запроса за самим
+объектом. Обе записи стирают сигналы posts.signals при сохранении и
+удалении объекта.
+
+В ключ попадает не само значение из URL, а его sha1: username и slug
+могут быть длинными и не-ASCII, а Memcached принимает ключи не длиннее
+250 байт без пробелов и управляющих символов.
+
+Найденные объекты лежат в общем для процессов кэше LOOKUP_CACHE_ALIAS:
+сигналы стирают запись в том процессе, где объект изменили, и другие
+воркеры тоже сразу перестают находить группу или пользователя под
+старым именем. Промахи лежат в кэше процесса: в общем файловом кэше
+каждый новый промах стоил бы обхода каталога при вытеснении, дороже
+самого запроса. Поэтому NEGATIVE_CACHE_TIMEOUT - секунды: этого хватает,
+чтобы краулер, повторяющий один URL, не доходил до базы, а только что
+созданный объект другие воркеры считают ненайденным не дольше.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404
+
+from .models import Group, Post, User
+
+# Модель -> поле, по которому её ищут view
+LOOKUP_FIELDS = {
+    Group: 'slug',
+    Post: 'pk',
+    User: 'username',
+}
+# Модели, найденные объекты которых тоже хранятся в кэше
+CACHED_MODELS = (Group, User)
+# Атрибут с исходным значением поля: по нему стирается старая запись,
+# если slug или username изменили.
+ORIGINAL_VALUE = '_lookup_original'
+
+
+def value_key(model, field, value):
+    digest = hashlib.sha1(str(value).encode()).hexdigest()
+    return f'{model._meta.label_lower}:{field}:{digest}'
+
+
+def missing_key(model, field, value):
+    return f'missing:{value_key(model, field, value)}'
+
+
+def object_key(model, field, value):
+    return f'object:{value_key(model, field, value)}'
+
+
+def lookup_cache():
+    return caches[settings.LOOKUP_CACHE_ALIAS]
+
+
+def negative_cache():
+    return caches[settings.NEGATIVE_CACHE_ALIAS]
+
+
+def get_or_404(model, **lookup):
+    """Как get_object_or_404, но промахи, а для CACHED_MODELS и
+    найденные объекты, берутся из кэша."""
+    (field, value), = lookup.items()
+    missing = missing_key(model, field, value)
+    found_key = object_key(model, field, value)
+    cached = model in CACHED_MODELS
+    if cached:
+        instance = lookup_cache().get(found_key)
+        if instance is not None:
+            return instance
+    if negative_cache().get(missing):
+        raise Http404(f'{model._meta.object_name} {value} не найден')
+    try:
+        instance = model._default_manager.get(**lookup)
+    except model.DoesNotExist:
+        negative_cache().set(
+            missing, True, settings.NEGATIVE_CACHE_TIMEOUT
+        )
+        raise Http404(f'{model._meta.object_name} {value} не найден')
+    if cached:
+        lookup_cache().set(
+            found_key, instance, settings.LOOKUP_CACHE_TIMEOUT
+        )
+    return instance
+
+
+def remember_original(instance):
+    field = LOOKUP_FIELDS[type(instance)]
+    setattr(instance, ORIGINAL_VALUE, instance.__dict__.get(field))
+
+
+def forget(instance):
+    """Стирает записи кэша для ключа объекта, текущего и исходного."""
+    model = type(instance)
+    field = LOOKUP_FIELDS[model]
+    value = getattr(instance, field)
+    negative_cache().delete(missing_key(model, field, value))
+    if model in CACHED_MODELS:
+        keys = [object_key(model, field, value)]
+        original = getattr(instance, ORIGINAL_VALUE, None)
+        if original is not None and original != value:
+            keys.append(object_key(model, field, original))
+        lookup_cache().delete_many(keys)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.following import follow_many, unfollow_many
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Подписывает пользователя на многих авторов или отписывает.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('authors', nargs='*')
+        parser.add_argument(
+            '--file',
+            help='Файл с именами авторов через пробелы или по строкам.'
+        )
+        parser.add_argument('--unfollow', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["username"]}')
+        authors = list(options['authors'])
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as names:
+                authors += names.read().replace(',', ' ').split()
+        if options['unfollow']:
+            changed, missing = unfollow_many(user, authors)
+            self.stdout.write(f'Отписан от авторов: {len(changed)}')
+        else:
+            changed, missing = follow_many(user, authors)
+            self.stdout.write(f'Новых подписок: {len(changed)}')
+        if missing:
+            self.stdout.write(f'Не найдены: {", ".join(missing)}')
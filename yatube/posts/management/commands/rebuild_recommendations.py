@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.recommendations import refresh
+
+
+class Command(BaseCommand):
+    help = 'Заново считает рекомендации «Кого почитать» всех пользователей.'
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        refresh(user_ids)
+        self.stdout.write(f'Пересчитано пользователей: {len(user_ids)}')
@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import refresh_queued
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации из очереди RecommendationQueue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, проверять очередь каждые '
+                 'RECOMMENDATIONS_POLL_INTERVAL секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = refresh_queued()
+            while done:
+                self.stdout.write(f'Пересчитано изменений: {done}')
+                done = refresh_queued()
+            if not options['loop']:
+                return
+            time.sleep(settings.RECOMMENDATIONS_POLL_INTERVAL)
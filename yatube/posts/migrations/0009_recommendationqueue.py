@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-19 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationQueue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('followers', 'Пользователь и его подписчики'), ('group', 'Авторы группы')], max_length=10, verbose_name='Что пересчитать')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id пользователя или группы')),
+            ],
+            options={
+                'verbose_name': 'Пересчёт рекомендаций',
+                'verbose_name_plural': 'Очередь пересчёта рекомендаций',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recommendationqueue',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique recommendation refresh'),
+        ),
+    ]
@@ -39,6 +39,16 @@ class Post(PubDateModel):
         ordering = ['-pub_date']
         verbose_name = 'Публикацию'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_LIMIT]
@@ -87,6 +97,11 @@ class Comment(CreatedModel):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -114,3 +129,65 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user.username} -> {self.author.username}'
+
+
+class Recommendation(models.Model):
+    """Автор, которого стоит предложить пользователю, и его вес."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to',
+        verbose_name='Автор',
+    )
+    score = models.PositiveIntegerField('Вес')
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique recommendation')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='recommendation_user_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}: {self.score}'
+
+
+class RecommendationQueue(models.Model):
+    """Изменение, после которого нужно пересчитать рекомендации
+    (posts.recommendations)."""
+    USER = 'user'
+    FOLLOWERS = 'followers'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (FOLLOWERS, 'Пользователь и его подписчики'),
+        (GROUP, 'Авторы группы'),
+    )
+    kind = models.CharField('Что пересчитать', max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField('id пользователя или группы')
+
+    class Meta:
+        ordering = ['pk']
+        verbose_name = 'Пересчёт рекомендаций'
+        verbose_name_plural = 'Очередь пересчёта рекомендаций'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique recommendation refresh')
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
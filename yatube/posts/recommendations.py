@@ -0,0 +1,231 @@
+"""Рекомендации «Кого почитать».
+
+Кандидаты для пользователя - авторы, на которых подписаны его авторы
+(подписки подписок), и авторы, которые публикуются в тех же группах,
+что и он. Лучшие RECOMMENDATIONS_TOP_K кандидатов хранятся в
+Recommendation, и виджет на страницах профиля и подписок читает их
+одним запросом по индексу (user, -score) вместо соединения
+Follow x Follow x Post.
+
+Подписка A на B меняет кандидатов самого A и подписчиков A, а новый,
+удалённый или перенесённый в другую группу пост - кандидатов авторов
+этой группы. Запрос, который меняет подписки или посты, только кладёт
+такое изменение в RecommendationQueue после коммита, одной вставкой на
+транзакцию. Пересчитывает очередь refresh_queued(): из фонового потока
+процесса (RECOMMENDATIONS_WORKER_THREAD) или из manage.py
+refresh_recommendations, как письма в core.mail, - тремя запросами на
+пачку пользователей и не больше RECOMMENDATIONS_FANOUT_LIMIT подписчиков
+или авторов группы на одно изменение. Остальных догоняет периодический
+manage.py rebuild_recommendations. Пересчёт, а не +1/-1 к весу, нужен
+из-за усечения до top-K: после отписки в список может подняться
+кандидат, которого в таблице не было.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+from .models import Follow, Post, Recommendation, RecommendationQueue
+
+logger = logging.getLogger(__name__)
+
+# Вес общего автора-подписки и общей группы в оценке кандидата
+FOLLOW_WEIGHT = 2
+GROUP_WEIGHT = 1
+# Сколько пользователей пересчитывать одним запросом: SQLite ограничивает
+# число параметров в IN.
+BATCH_SIZE = 500
+
+# Пользователи и группы, изменённые в незакоммиченной транзакции
+pending = threading.local()
+
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def scores(user_ids):
+    """{user_id: {author_id: вес}} для пользователей user_ids."""
+    result = defaultdict(lambda: defaultdict(int))
+    # Follow f2 (b -> c), где b.following содержит f1 (u -> b)
+    co_follows = Follow.objects.filter(
+        user__following__user_id__in=user_ids
+    ).values_list('user__following__user_id', 'author_id').annotate(
+        count=Count('pk')
+    ).order_by()
+    for user_id, author_id, count in co_follows:
+        result[user_id][author_id] += count * FOLLOW_WEIGHT
+    shared_groups = Post.objects.filter(
+        group__posts__author_id__in=user_ids
+    ).values_list('group__posts__author_id', 'author_id').annotate(
+        count=Count('group', distinct=True)
+    ).order_by()
+    for user_id, author_id, count in shared_groups:
+        result[user_id][author_id] += count * GROUP_WEIGHT
+    return result
+
+
+def refresh(user_ids):
+    """Пересчитывает рекомендации пользователей user_ids."""
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        refresh_batch(user_ids[start:start + BATCH_SIZE])
+
+
+def refresh_batch(user_ids):
+    candidates = scores(user_ids)
+    excluded = {user_id: {user_id} for user_id in user_ids}
+    for user_id, author_id in Follow.objects.filter(
+            user_id__in=user_ids).values_list('user_id', 'author_id'):
+        excluded[user_id].add(author_id)
+    rows = []
+    for user_id in user_ids:
+        ranked = sorted(
+            (-score, author_id)
+            for author_id, score in candidates[user_id].items()
+            if author_id not in excluded[user_id]
+        )[:settings.RECOMMENDATIONS_TOP_K]
+        rows += [
+            Recommendation(user_id=user_id, author_id=author_id, score=-score)
+            for score, author_id in ranked
+        ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        Recommendation.objects.bulk_create(rows)
+
+
+def schedule(**changes):
+    """Запоминает изменения до коммита и один раз на транзакцию ставит
+    их в очередь после коммита: unfollow_many с сотней post_delete
+    добавляет в очередь одну пачку строк. После отката изменения
+    остаются до следующего коммита в потоке - лишний пересчёт
+    безвреден."""
+    for kind, ids in changes.items():
+        changed = getattr(pending, kind, None)
+        if changed is None:
+            changed = set()
+            setattr(pending, kind, changed)
+        changed.update(ids)
+    connection = transaction.get_connection()
+    if not any(
+            callback is enqueue_pending
+            for _, callback in connection.run_on_commit):
+        transaction.on_commit(enqueue_pending)
+
+
+def follow_changed(user_id):
+    """Подписки user_id изменились: пересчёт для него и подписчиков."""
+    schedule(**{RecommendationQueue.FOLLOWERS: [user_id]})
+
+
+def groups_changed(group_ids, author_id):
+    """Посты групп изменились: пересчёт для их авторов. author_id
+    пересчитывается отдельно - после удаления его последнего поста
+    группа его уже не содержит."""
+    group_ids = [group_id for group_id in group_ids if group_id]
+    if group_ids:
+        schedule(**{
+            RecommendationQueue.GROUP: group_ids,
+            RecommendationQueue.USER: [author_id],
+        })
+
+
+def enqueue_pending():
+    rows = []
+    for kind, _ in RecommendationQueue.KINDS:
+        changed = getattr(pending, kind, None) or set()
+        setattr(pending, kind, set())
+        rows += [
+            RecommendationQueue(kind=kind, object_id=object_id)
+            for object_id in changed
+        ]
+    if not rows:
+        return
+    RecommendationQueue.objects.bulk_create(rows, ignore_conflicts=True)
+    if settings.RECOMMENDATIONS_WORKER_THREAD:
+        start_worker()
+        _wakeup.set()
+
+
+def refresh_queued(batch_size=None):
+    """Пересчитывает одну пачку очереди, возвращает число строк.
+
+    Строки удаляются до пересчёта: изменение, пришедшее во время него,
+    снова попадёт в очередь, а не совпадёт с удаляемой строкой.
+    """
+    batch = list(RecommendationQueue.objects.values_list(
+        'pk', 'kind', 'object_id'
+    )[:batch_size or settings.RECOMMENDATIONS_QUEUE_BATCH_SIZE])
+    if not batch:
+        return 0
+    RecommendationQueue.objects.filter(
+        pk__in=[pk for pk, _, _ in batch]
+    ).delete()
+    changed = defaultdict(set)
+    for _, kind, object_id in batch:
+        changed[kind].add(object_id)
+    refresh(affected_users(
+        changed[RecommendationQueue.USER],
+        changed[RecommendationQueue.FOLLOWERS],
+        changed[RecommendationQueue.GROUP],
+    ))
+    return len(batch)
+
+
+def affected_users(users, followers_of, groups):
+    """users, followers_of, не больше RECOMMENDATIONS_FANOUT_LIMIT
+    подписчиков followers_of и столько же авторов групп groups.
+    Остальных пересчитывает периодический rebuild_recommendations."""
+    limit = settings.RECOMMENDATIONS_FANOUT_LIMIT
+    users = users | followers_of
+    if followers_of:
+        users.update(Follow.objects.filter(
+            author_id__in=followers_of
+        ).order_by('-pk').values_list('user_id', flat=True)[:limit])
+    if groups:
+        users.update(Post.objects.filter(
+            group_id__in=groups
+        ).order_by('author_id').values_list(
+            'author_id', flat=True
+        ).distinct()[:limit])
+    return users
+
+
+def run_worker():
+    while True:
+        _wakeup.wait(settings.RECOMMENDATIONS_POLL_INTERVAL)
+        _wakeup.clear()
+        try:
+            while refresh_queued():
+                pass
+        except Exception:
+            logger.exception('Ошибка пересчёта рекомендаций')
+        finally:
+            close_old_connections()
+
+
+def start_worker():
+    """Запускает фоновый поток пересчёта в этом процессе, если его нет."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=run_worker, name='recommendations', daemon=True
+            )
+            _worker.start()
+
+
+def recommendations_for(user, exclude=()):
+    """Рекомендованные пользователю авторы, один запрос."""
+    if not user.is_authenticated:
+        return []
+    return [
+        recommendation.author for recommendation in
+        Recommendation.objects.filter(user=user).select_related(
+            'author'
+        ).order_by('-score')
+        if recommendation.author_id not in exclude
+    ]
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .following import clear_following_cache
+from .graph import graph
+from .lookups import forget, remember_original
+from .models import Follow, Group, Post, Recommendation, User
+from .recommendations import follow_changed, groups_changed
+
+
+@receiver(post_save, sender=Post)
+def notify_new_post(sender, instance, created, **kwargs):
+    """После коммита рассылает новый пост подписчикам SSE."""
+    if created:
+        # events тянет asyncio и загрузку шаблонов, нужные не каждому
+        # процессу (manage.py, воркер почты), поэтому импорт здесь.
+        from .events import publish_post
+        transaction.on_commit(lambda: publish_post(instance))
+
+
+@receiver(post_init, sender=Group)
+@receiver(post_init, sender=User)
+def track_lookup_value(sender, instance, **kwargs):
+    remember_original(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def clear_lookup_cache(sender, instance, **kwargs):
+    """Стирает кэш поиска по ключу объекта. Повторно после коммита:
+    запрос, не видевший ещё незакоммиченную строку, мог успеть снова
+    записать промах или старую версию."""
+    forget(instance)
+    transaction.on_commit(lambda: forget(instance))
+
+
+@receiver(post_save, sender=User)
+def new_user_following(sender, instance, created, **kwargs):
+    """id нового пользователя мог принадлежать удалённому: его подписки
+    не должны достаться новому из общего кэша."""
+    if created:
+        clear_following_cache(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        clear_following_cache(instance.user_id)
+        transaction.on_commit(
+            lambda: graph.add(instance.user_id, instance.author_id)
+        )
+        follow_changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    clear_following_cache(instance.user_id)
+    transaction.on_commit(
+        lambda: graph.remove(instance.user_id, instance.author_id)
+    )
+    follow_changed(instance.user_id)
+
+
+@receiver(post_init, sender=Post)
+def track_post_group(sender, instance, **kwargs):
+    instance._original_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_group_saved(sender, instance, created, **kwargs):
+    """Новый или перенесённый пост меняет кандидатов авторов старой и
+    новой группы."""
+    original = instance._original_group_id
+    if created or original != instance.group_id:
+        groups_changed([original, instance.group_id], instance.author_id)
+    instance._original_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_group_deleted(sender, instance, **kwargs):
+    groups_changed([instance.group_id], instance.author_id)
+
+
+@receiver(post_delete, sender=User)
+def drop_recommendations(sender, instance, **kwargs):
+    """При каскадном удалении пользователя пересчёт по его подпискам
+    мог успеть снова предложить его другим."""
+    Recommendation.objects.filter(author_id=instance.pk).delete()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..events import (author_channel, broker, follow_channels, publish_post,
+                      stream)
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostEventsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.follower = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def listen(self, path, publish):
+        """Открывает SSE-поток, вызывает publish и отключается."""
+        sent = []
+
+        async def run():
+            disconnected = asyncio.Event()
+            requests = [{'type': 'http.request', 'body': b''}]
+
+            async def receive():
+                # Как у сервера ASGI: сначала тело запроса, потом ожидание
+                # отключения клиента.
+                if requests:
+                    return requests.pop()
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if message.get('body', b'').startswith(b': connected'):
+                    thread = threading.Thread(target=publish)
+                    thread.start()
+                    await asyncio.get_event_loop().run_in_executor(
+                        None, thread.join
+                    )
+                elif message.get('more_body'):
+                    disconnected.set()
+
+            scope = {'type': 'http', 'path': path, 'headers': []}
+            await asyncio.wait_for(stream(scope, receive, send), timeout=5)
+
+        asyncio.run(run())
+        return sent
+
+    def test_group_stream_receives_new_post(self):
+        """Подписчик ленты группы получает id и карточку нового поста."""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Новый пост'
+        )
+        sent = self.listen(
+            f'/events/group/{self.group.slug}/', lambda: publish_post(post)
+        )
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(sent[-1], {'type': 'http.response.body', 'body': b''})
+        event = sent[-2]['body'].decode()
+        self.assertTrue(event.startswith(f'id: {post.pk}\nevent: post\n'))
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(data['id'], post.pk)
+        self.assertIn('Новый пост', data['html'])
+        self.assertFalse(broker.subscribers)
+
+    def test_unknown_stream_not_found(self):
+        """Неизвестная лента отвечает 404."""
+        sent = self.listen('/events/unknown/', lambda: None)
+        self.assertEqual(sent[0]['status'], 404)
+
+    def test_follow_channels(self):
+        """Лента подписок слушает каналы авторов из Follow."""
+        self.client.force_login(self.follower)
+        self.assertEqual(
+            follow_channels(self.client.session.session_key),
+            [author_channel(self.user.pk)]
+        )
+        self.assertIsNone(follow_channels(None))
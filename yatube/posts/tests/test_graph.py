@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase
+
+from .. import graph as graph_module
+from ..graph import CSR, FollowGraph, graph
+from ..models import Follow
+
+User = get_user_model()
+
+
+class CSRTest(TestCase):
+    def test_rows_and_transpose(self):
+        """Строки CSR и обратного графа отсортированы."""
+        csr = CSR.from_pairs([(1, 3), (1, 5), (2, 1), (5, 1)])
+        self.assertEqual(list(csr.row(1)), [3, 5])
+        self.assertEqual(list(csr.row(4)), [])
+        self.assertEqual(list(csr.row(100)), [])
+        self.assertTrue(csr.has(2, 1))
+        self.assertFalse(csr.has(2, 3))
+        followers = csr.transpose()
+        self.assertEqual(list(followers.row(1)), [2, 5])
+        self.assertEqual(list(followers.row(5)), [1])
+        self.assertEqual(csr.nbytes(), 4 * (7 + 4))
+
+
+class FollowGraphSignalsTest(TransactionTestCase):
+    def test_follow_signals(self):
+        """Граф процесса загружается из Follow и следит за подписками."""
+        reader = User.objects.create_user(username='Reader')
+        author = User.objects.create_user(username='Author')
+        Follow.objects.create(user=author, author=reader)
+        graph.reload()
+        self.assertEqual(list(graph.followers(reader.pk)), [author.pk])
+        follow = Follow.objects.create(user=reader, author=author)
+        self.assertEqual(graph.mutual(reader.pk), [author.pk])
+        follow.delete()
+        self.assertEqual(graph.mutual(reader.pk), [])
+
+    def test_rolled_back_follow_not_in_graph(self):
+        """Подписка из откатившейся транзакции не попадает в граф."""
+        reader = User.objects.create_user(username='Reader')
+        author = User.objects.create_user(username='Author')
+        graph.reload()
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=reader, author=author)
+                raise IntegrityError
+        self.assertFalse(graph.is_following(reader.pk, author.pk))
+
+
+class FollowGraphTest(TestCase):
+    def setUp(self):
+        self.graph = FollowGraph()
+        # 1 <-> 2, 1 -> 3, 3 -> 4
+        self.graph.load_edges([(1, 2), (1, 3), (2, 1), (3, 4)])
+
+    def test_queries(self):
+        self.assertEqual(list(self.graph.following(1)), [2, 3])
+        self.assertEqual(list(self.graph.followers(1)), [2])
+        self.assertEqual(self.graph.follower_count(4), 1)
+        self.assertEqual(self.graph.mutual(1), [2])
+        self.assertEqual(self.graph.common_following(1, 2), [])
+        self.assertEqual(self.graph.reach(1), {2, 3, 4})
+        self.assertEqual(self.graph.reach(1, hops=1), {2, 3})
+
+    def test_updates_and_compaction(self):
+        """Изменения видны сразу и сохраняются после пересборки CSR."""
+        self.graph.add(4, 1)
+        self.graph.add(7, 1)
+        self.graph.remove(1, 3)
+        self.graph.remove(1, 3)
+        self.assertTrue(self.graph.is_following(7, 1))
+        self.assertEqual(list(self.graph.following(1)), [2])
+        self.assertEqual(list(self.graph.followers(1)), [2, 4, 7])
+        self.assertEqual(self.graph.following_count(1), 1)
+        with mock.patch.object(graph_module, 'COMPACT_MIN', 0):
+            self.graph.add(3, 1)
+        self.assertEqual(self.graph.following_edges.changes, 0)
+        self.assertEqual(list(self.graph.followers(1)), [2, 3, 4, 7])
+        self.assertEqual(list(self.graph.following(7)), [1])
+        self.assertEqual(self.graph.mutual(1), [2])
+
+    def test_reloaded_when_stale(self):
+        """Подписки из других процессов видны после
+        FOLLOW_GRAPH_MAX_AGE."""
+        reader = User.objects.create_user(username='Reader')
+        author = User.objects.create_user(username='Author')
+        graph.reload()
+        # bulk_create не шлёт сигналов, как подписка в другом воркере
+        Follow.objects.bulk_create([Follow(user=reader, author=author)])
+        self.assertEqual(list(graph.following(reader.pk)), [])
+        with self.settings(FOLLOW_GRAPH_MAX_AGE=60), mock.patch.object(
+            graph_module.time, 'monotonic',
+            return_value=graph.loaded_at + 61,
+        ):
+            self.assertEqual(list(graph.following(reader.pk)), [author.pk])
+        graph.load_edges([])
+        graph.loaded_at -= 10 ** 6
+        with self.settings(FOLLOW_GRAPH_MAX_AGE=None):
+            self.assertEqual(list(graph.following(reader.pk)), [])
+
+    def test_writes_do_not_reload(self):
+        """Подписка не перечитывает устаревший граф."""
+        self.graph.loaded_at -= 10 ** 6
+        with self.settings(FOLLOW_GRAPH_MAX_AGE=60), \
+                self.assertNumQueries(0):
+            self.graph.add(4, 1)
+            self.graph.remove(1, 2)
+        self.assertEqual(self.graph.following_edges.changes, 2)
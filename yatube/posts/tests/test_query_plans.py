@@ -0,0 +1,88 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?posts_\w+$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.user = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.authorized_client.get(url)
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                yield query['sql'], [row[-1] for row in cursor.fetchall()]
+
+    def test_feed_queries_use_indexes(self):
+        """
+        Запросы лент и комментариев не сканируют таблицы целиком
+        и не сортируют во временном B-дереве.
+
+        """
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            for sql, plan in self.query_plans(url):
+                with self.subTest(url=url, sql=sql):
+                    self.assertFalse(
+                        [step for step in plan if FULL_SCAN.match(step)],
+                        plan
+                    )
+                    self.assertNotIn(TEMP_SORT, plan)
+
+    def test_follow_feed_has_no_full_scan(self):
+        """
+        Лента подписок читает посты по индексу автора. Она сливает посты
+        нескольких авторов, поэтому сортировка страницы допустима.
+
+        """
+        url = reverse('posts:follow_index')
+        for sql, plan in self.query_plans(url):
+            with self.subTest(sql=sql):
+                self.assertFalse(
+                    [step for step in plan if FULL_SCAN.match(step)], plan
+                )
@@ -1,16 +1,37 @@
 import shutil
 import tempfile
+import time
+from http import HTTPStatus
+from io import StringIO
 from typing import List
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.cache.backends import locmem
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_delete
+from django.http import Http404
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post
+from core.cache import FileBasedCache
+
+from .. import recommendations
+from ..following import (follow_many, following_cache, following_ids,
+                         following_set, unfollow_many)
+from ..graph import graph
+from ..lookups import (get_or_404, lookup_cache, missing_key, negative_cache,
+                       object_key)
+from ..models import (Comment, Follow, Group, Post, Recommendation,
+                      RecommendationQueue)
+from ..recommendations import recommendations_for, refresh_queued
 
 User = get_user_model()
 COUNT_POSTS_ON_FIRST_PAGE: int = 10
@@ -653,3 +674,483 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:group_list', kwargs={'slug': self.group.slug}
                     )))
         self.assertEqual(response.context['group'], self.group)
+
+
+class NegativeLookupCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        lookup_cache().clear()
+        negative_cache().clear()
+
+    def assertNotFound(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_unknown_profile_is_404(self):
+        """Несуществующий профиль - 404, повторный запрос без SQL."""
+        url = reverse('posts:profile', kwargs={'username': 'nobody'})
+        self.assertNotFound(url)
+        with self.assertNumQueries(0):
+            self.assertNotFound(url)
+
+    def test_missing_group_and_post_cached(self):
+        """Промахи по slug группы и id поста кэшируются."""
+        for url in (
+            reverse('posts:group_list', kwargs={'slug': 'no-group'}),
+            reverse('posts:post_detail', kwargs={'post_id': 999}),
+        ):
+            with self.subTest(url=url):
+                self.assertNotFound(url)
+                with self.assertNumQueries(0):
+                    self.assertNotFound(url)
+
+    def test_misses_hashed_in_own_cache(self):
+        """Промах лежит в своём кэше под коротким ASCII-ключом."""
+        username = 'пользователь ' * 30
+        with self.assertRaises(Http404):
+            get_or_404(User, username=username)
+        key = missing_key(User, 'username', username)
+        self.assertTrue(key.isascii())
+        self.assertLess(len(key), 250)
+        self.assertNotIn(username, key)
+        self.assertTrue(negative_cache().get(key))
+        self.assertIsNone(cache.get(key))
+
+    def test_object_created_in_other_process_found_soon(self):
+        """Объект, созданный в другом процессе, чьи сигналы не стёрли
+        промах здесь, находится после NEGATIVE_CACHE_TIMEOUT."""
+        url = reverse('posts:profile', kwargs={'username': 'newcomer'})
+        self.assertNotFound(url)
+        # bulk_create не шлёт сигналов, как создание в другом воркере
+        User.objects.bulk_create([User(username='newcomer')])
+        self.assertNotFound(url)
+        later = time.time() + settings.NEGATIVE_CACHE_TIMEOUT + 1
+        with mock.patch.object(locmem.time, 'time', return_value=later):
+            self.assertEqual(
+                self.client.get(url).status_code, HTTPStatus.OK
+            )
+        self.assertLessEqual(settings.NEGATIVE_CACHE_TIMEOUT, 30)
+
+    def test_created_object_clears_miss(self):
+        """Создание объекта стирает запомненный промах."""
+        url = reverse('posts:group_list', kwargs={'slug': 'new-group'})
+        self.assertNotFound(url)
+        Group.objects.create(
+            title='Новая', slug='new-group', description='Описание'
+        )
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+
+
+class LookupCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        lookup_cache().clear()
+        self.group = Group.objects.create(
+            title='Группа', slug='cached-group', description='Описание'
+        )
+        self.url = reverse('posts:group_list', kwargs={'slug': 'cached-group'})
+
+    def test_group_read_from_cache(self):
+        """Повторный поиск группы по slug не обращается к БД."""
+        self.assertEqual(get_or_404(Group, slug='cached-group'), self.group)
+        with self.assertNumQueries(0):
+            group = get_or_404(Group, slug='cached-group')
+        self.assertEqual(group.title, 'Группа')
+
+    def test_group_page_saves_query(self):
+        """Страница группы из кэша делает на запрос меньше."""
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(self.url)
+        self.assertEqual(len(second), len(first) - 1)
+
+    def test_save_and_rename_invalidate(self):
+        """Изменение и смена slug стирают старые записи кэша."""
+        get_or_404(Group, slug='cached-group')
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(
+            get_or_404(Group, slug='cached-group').title, 'Новое название'
+        )
+        self.group.slug = 'renamed-group'
+        self.group.save()
+        with self.assertRaises(Http404):
+            get_or_404(Group, slug='cached-group')
+        self.assertEqual(
+            get_or_404(Group, slug='renamed-group').pk, self.group.pk
+        )
+
+    def test_rename_seen_by_other_processes(self):
+        """Смена slug стирает запись и в кэше другого процесса."""
+        other_process = FileBasedCache(
+            settings.CACHES[settings.LOOKUP_CACHE_ALIAS]['LOCATION'], {}
+        )
+        get_or_404(Group, slug='cached-group')
+        key = object_key(Group, 'slug', 'cached-group')
+        self.assertEqual(other_process.get(key), self.group)
+        self.group.slug = 'renamed-group'
+        self.group.save()
+        self.assertIsNone(other_process.get(key))
+
+    def test_delete_invalidates(self):
+        """Удалённый пользователь не отдаётся из кэша."""
+        user = User.objects.create_user(username='Leaving')
+        get_or_404(User, username='Leaving')
+        user.delete()
+        with self.assertRaises(Http404):
+            get_or_404(User, username='Leaving')
+
+
+class FollowingSetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        following_cache().clear()
+        self.user = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Writer')
+        self.other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.user, author=self.other)
+        self.client.force_login(self.user)
+
+    def test_follow_and_unfollow_invalidate_cached_set(self):
+        """Подписка и отписка стирают кэш, следующее чтение берёт
+        подписки из базы одним запросом."""
+        self.assertEqual(list(following_ids(self.user.pk)), [self.other.pk])
+        with self.assertNumQueries(0):
+            following_ids(self.user.pk)
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Writer'})
+        )
+        with self.assertNumQueries(1):
+            ids = following_ids(self.user.pk)
+        self.assertEqual(
+            list(ids), sorted([self.other.pk, self.author.pk])
+        )
+        self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'Other'})
+        )
+        self.assertEqual(list(following_ids(self.user.pk)), [self.author.pk])
+
+    def test_follow_seen_by_other_processes(self):
+        """Подписка стирает запись и в кэше другого процесса."""
+        other_process = FileBasedCache(
+            settings.CACHES[settings.FOLLOWING_CACHE_ALIAS]['LOCATION'], {}
+        )
+        following_ids(self.user.pk)
+        key = f'following:{self.user.pk}'
+        self.assertEqual(list(other_process.get(key)), [self.other.pk])
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertIsNone(other_process.get(key))
+
+    def test_rolled_back_follow_not_cached(self):
+        """Подписка из откатившейся транзакции не остаётся в кэше."""
+        following_ids(self.user.pk)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.user, author=self.author)
+                raise IntegrityError
+        self.assertEqual(list(following_ids(self.user.pk)), [self.other.pk])
+
+    def test_is_following(self):
+        """is_following отвечает по загруженному множеству."""
+        following = following_set(self.user)
+        with self.assertNumQueries(0):
+            self.assertTrue(following.is_following(self.other.pk))
+            self.assertFalse(following.is_following(self.author.pk))
+            self.assertIn(self.other.pk, following)
+
+    def test_profile_follow_button(self):
+        """Кнопка на профиле соответствует подписке."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'Other'})
+        )
+        self.assertTrue(response.context['following'])
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'Writer'})
+        )
+        self.assertFalse(response.context['following'])
+
+
+class RecommendationTest(TransactionTestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='Reader')
+        self.friend = User.objects.create_user(username='Friend')
+        self.author = User.objects.create_user(username='Author')
+        self.neighbour = User.objects.create_user(username='Neighbour')
+        self.group = Group.objects.create(title='Группа', slug='group')
+
+    def refresh(self):
+        while refresh_queued():
+            pass
+
+    def recommended(self, user):
+        self.refresh()
+        return list(
+            Recommendation.objects.filter(user=user).values_list(
+                'author__username', 'score'
+            )
+        )
+
+    def test_follows_of_followees(self):
+        """Подписки авторов пользователя становятся кандидатами."""
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.author)
+        self.assertEqual(self.recommended(self.reader), [('Author', 2)])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.recommended(self.reader), [])
+        Follow.objects.filter(user=self.friend).delete()
+        self.assertEqual(self.recommended(self.reader), [])
+
+    def test_shared_groups(self):
+        """Авторы из тех же групп, подписки весят больше группы."""
+        Post.objects.create(
+            author=self.neighbour, text='Сосед', group=self.group
+        )
+        Post.objects.create(author=self.reader, text='Я', group=self.group)
+        self.assertEqual(self.recommended(self.reader), [('Neighbour', 1)])
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.author)
+        self.assertEqual(
+            self.recommended(self.reader), [('Author', 2), ('Neighbour', 1)]
+        )
+
+    def test_top_k(self):
+        """Хранится не больше RECOMMENDATIONS_TOP_K авторов."""
+        Follow.objects.create(user=self.reader, author=self.friend)
+        with self.settings(RECOMMENDATIONS_TOP_K=2):
+            for index in range(3):
+                Follow.objects.create(
+                    user=self.friend,
+                    author=User.objects.create_user(username=f'A{index}'),
+                )
+            self.assertEqual(len(self.recommended(self.reader)), 2)
+
+    def test_group_posts_refresh_members(self):
+        """Новый пост в группе пересчитывает всех её авторов, а
+        удалённый или перенесённый убирает общую группу."""
+        Post.objects.create(author=self.reader, text='Я', group=self.group)
+        post = Post.objects.create(
+            author=self.neighbour, text='Сосед', group=self.group
+        )
+        self.assertEqual(self.recommended(self.reader), [('Neighbour', 1)])
+        post.group = None
+        post.save()
+        self.assertEqual(self.recommended(self.reader), [])
+        post.group = self.group
+        post.save()
+        self.assertEqual(self.recommended(self.reader), [('Neighbour', 1)])
+        post.delete()
+        self.assertEqual(self.recommended(self.reader), [])
+        self.assertEqual(self.recommended(self.neighbour), [])
+
+    def test_fanout_limit(self):
+        """На одно изменение пересчитывается не больше
+        RECOMMENDATIONS_FANOUT_LIMIT подписчиков."""
+        readers = [
+            User.objects.create_user(username=f'R{index}')
+            for index in range(3)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.friend)
+        self.refresh()
+        Follow.objects.create(user=self.friend, author=self.author)
+        with self.settings(RECOMMENDATIONS_FANOUT_LIMIT=2):
+            self.refresh()
+        self.assertEqual(self.recommended(readers[0]), [])
+        for reader in readers[1:]:
+            self.assertEqual(self.recommended(reader), [('Author', 2)])
+        call_command('rebuild_recommendations', stdout=StringIO())
+        self.assertEqual(self.recommended(readers[0]), [('Author', 2)])
+
+    def test_refresh_queued_outside_request(self):
+        """Пост в группе и подписка не пересчитывают рекомендации сами,
+        а ставят изменения в очередь одной вставкой."""
+        for create in (
+            lambda: Post.objects.create(
+                author=self.reader, text='Я', group=self.group
+            ),
+            lambda: Follow.objects.create(
+                user=self.reader, author=self.friend
+            ),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                create()
+            sql = [query['sql'] for query in queries]
+            self.assertEqual(
+                sum('INTO "posts_recommendationqueue"' in query
+                    for query in sql), 1
+            )
+            self.assertFalse(any(
+                '"posts_recommendation"' in query for query in sql
+            ))
+        self.assertEqual(RecommendationQueue.objects.count(), 3)
+        with transaction.atomic():
+            for index in range(3):
+                Post.objects.create(
+                    author=self.neighbour, text=str(index), group=self.group
+                )
+            self.assertEqual(sum(
+                callback is recommendations.enqueue_pending
+                for _, callback in connection.run_on_commit
+            ), 1)
+        self.assertEqual(RecommendationQueue.objects.count(), 4)
+        self.assertEqual(self.recommended(self.reader), [('Neighbour', 1)])
+        self.assertFalse(RecommendationQueue.objects.exists())
+
+    def test_deleted_author_not_recommended(self):
+        """Удалённый пользователь исчезает из рекомендаций."""
+        Post.objects.create(
+            author=self.neighbour, text='Сосед', group=self.group
+        )
+        Post.objects.create(author=self.reader, text='Я', group=self.group)
+        Follow.objects.create(user=self.neighbour, author=self.reader)
+        self.neighbour.delete()
+        self.assertEqual(self.recommended(self.reader), [])
+
+    def test_widget_single_query(self):
+        """Виджет на профиле и в подписках читает таблицу одним
+        запросом."""
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.author)
+        self.refresh()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                recommendations_for(self.reader), [self.author]
+            )
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['recommendations'], [self.author])
+        self.assertContains(response, 'Кого почитать')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'Author'})
+        )
+        self.assertEqual(response.context['recommendations'], [])
+
+
+class BulkFollowTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Reader')
+        self.authors = [
+            User.objects.create_user(username=f'author{index}')
+            for index in range(20)
+        ]
+        self.client.force_login(self.user)
+
+    def follow_queries(self, usernames):
+        with CaptureQueriesContext(connection) as queries:
+            follow_many(self.user, usernames)
+        return len(queries)
+
+    def test_query_count_does_not_grow(self):
+        """Число запросов не зависит от числа авторов."""
+        few = self.follow_queries(['author0', 'author1'])
+        many = self.follow_queries(
+            [author.username for author in self.authors[2:]]
+        )
+        self.assertEqual(few, many)
+        self.assertEqual(
+            Follow.objects.filter(user=self.user).count(), len(self.authors)
+        )
+
+    def test_caches_updated(self):
+        """Кэш подписок и граф меняются вместе с таблицей."""
+        graph.reload()
+        self.assertEqual(list(following_ids(self.user.pk)), [])
+        follow_many(self.user, ['author0', 'author1'])
+        pks = [self.authors[0].pk, self.authors[1].pk]
+        self.assertEqual(list(following_ids(self.user.pk)), pks)
+        self.assertEqual(list(graph.following(self.user.pk)), pks)
+        unfollow_many(self.user, ['author0'])
+        self.assertEqual(list(following_ids(self.user.pk)), pks[1:])
+        self.assertEqual(list(graph.following(self.user.pk)), pks[1:])
+
+    def test_unfollow_sends_signals_and_refreshes_once(self):
+        """Отписка шлёт post_delete на каждую строку, а рекомендации
+        пересчитываются один раз после коммита."""
+        usernames = [author.username for author in self.authors[:3]]
+        follow_many(self.user, usernames)
+        deleted = []
+        post_delete.connect(
+            lambda instance, **kwargs: deleted.append(instance.author_id),
+            sender=Follow, weak=False, dispatch_uid='test_unfollow',
+        )
+        self.addCleanup(
+            post_delete.disconnect, sender=Follow, dispatch_uid='test_unfollow'
+        )
+        RecommendationQueue.objects.all().delete()
+        with mock.patch(
+            'posts.recommendations.enqueue_pending',
+            wraps=recommendations.enqueue_pending,
+        ) as enqueue_pending:
+            unfollow_many(self.user, usernames)
+        self.assertEqual(len(deleted), 3)
+        enqueue_pending.assert_called_once_with()
+        self.assertEqual(
+            list(RecommendationQueue.objects.values_list(
+                'kind', 'object_id'
+            )),
+            [(RecommendationQueue.FOLLOWERS, self.user.pk)],
+        )
+
+    def test_endpoints(self):
+        """Повторы, себя и уже существующие подписки не создают строк."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        response = self.client.post(
+            reverse('posts:profile_follow_bulk'),
+            {'usernames': ['author0, author1 author2', 'author1',
+                           'Reader', 'ghost']},
+        )
+        self.assertEqual(
+            response.json(),
+            {'followed': ['author1', 'author2'], 'missing': ['ghost']},
+        )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 3)
+        response = self.client.post(
+            reverse('posts:profile_unfollow_bulk'),
+            {'usernames': 'author2 author3'},
+        )
+        self.assertEqual(
+            response.json(), {'unfollowed': ['author2'], 'missing': []}
+        )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 2)
+
+    def test_followed_in_request_order(self):
+        """Имена в ответе идут в порядке запроса, а не базы."""
+        usernames = ['author5', 'author1', 'author3']
+        self.assertEqual(follow_many(self.user, usernames), (usernames, []))
+        self.assertEqual(
+            unfollow_many(self.user, usernames[::-1]),
+            (usernames[::-1], []),
+        )
+
+    def test_rate_limited(self):
+        """Массовая подписка ограничена RATE_LIMITS отдельно от
+        обычной."""
+        url = reverse('posts:profile_follow_bulk')
+        for _ in range(2):
+            response = self.client.post(url, {'usernames': 'author0'})
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.client.post(url, {'usernames': 'author1'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    def test_limit_and_method(self):
+        """Больше BULK_FOLLOW_LIMIT имён - 400, GET не принимается."""
+        url = reverse('posts:profile_follow_bulk')
+        with self.settings(BULK_FOLLOW_LIMIT=2):
+            response = self.client.post(url, {'usernames': 'a b c'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_command(self):
+        """manage.py bulk_follow подписывает и отписывает."""
+        call_command(
+            'bulk_follow', 'Reader', 'author0', 'author1', stdout=StringIO()
+        )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 2)
+        call_command(
+            'bulk_follow', 'Reader', 'author0', '--unfollow',
+            stdout=StringIO(),
+        )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
@@ -14,6 +14,10 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/bulk/', views.profile_follow_bulk,
+         name='profile_follow_bulk'),
+    path('unfollow/bulk/', views.profile_unfollow_bulk,
+         name='profile_unfollow_bulk'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
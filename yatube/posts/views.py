@@ -1,10 +1,18 @@
+from http import HTTPStatus
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
+from .following import follow_many, following_set, unfollow_many
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .lookups import get_or_404
+from .models import Follow, Group, Post, User
+from .recommendations import recommendations_for
 
 NUMBER_OF_POSTS_PER_PAGE: int = 10
 
@@ -23,7 +31,7 @@ def index(request):
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = get_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author', 'group')
     paginator = Paginator(post_list, NUMBER_OF_POSTS_PER_PAGE)
     page_number = request.GET.get('page')
@@ -36,31 +44,30 @@ def group_posts(request, slug):
 
 
 def profile(request, username):
-    user = User.objects.get(username=username)
+    user = get_or_404(User, username=username)
     post_list = user.posts.select_related('author', 'group')
     paginator = Paginator(post_list, NUMBER_OF_POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    following = False
-    if (request.user != user
-            and request.user.is_authenticated
-            and Follow.objects.filter(
-                user=request.user,
-                author=user,
-            ).exists()):
-        following = True
+    following = (
+        request.user != user
+        and following_set(request.user).is_following(user.pk)
+    )
     context = {
         'username': user,
         'page_obj': page_obj,
         'following': following,
+        'recommendations': recommendations_for(
+            request.user, exclude={user.pk}
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.select_related('post', 'author')
+    comments = post.comments.select_related('author')
 
     context = {
         'post': post,
@@ -91,7 +98,7 @@ def post_create(request):
 
 def post_edit(request, post_id):
     is_edit = True
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_or_404(Post, pk=post_id)
 
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
@@ -115,9 +122,9 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.select_related('author').filter(post=post)
+    comments = post.comments.select_related('author')
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -141,7 +148,8 @@ def follow_index(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'recommendations': recommendations_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -149,7 +157,7 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     if username != request.user.username:
-        user = get_object_or_404(User, username=username)
+        user = get_or_404(User, username=username)
         Follow.objects.get_or_create(user=request.user, author=user)
 
     return redirect("posts:profile", username=username)
@@ -163,3 +171,32 @@ def profile_unfollow(request, username):
         user=request.user,
     ).delete()
     return redirect("posts:profile", username=username)
+
+
+def bulk_follow_response(request, change, key):
+    """Применяет follow_many или unfollow_many к именам из POST: параметр
+    usernames повторяется, в значении имена через запятую или пробелы."""
+    usernames = [
+        name
+        for value in request.POST.getlist('usernames')
+        for name in value.replace(',', ' ').split()
+    ]
+    if len(usernames) > settings.BULK_FOLLOW_LIMIT:
+        return JsonResponse(
+            {'error': f'Не больше {settings.BULK_FOLLOW_LIMIT} имён'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+    changed, missing = change(request.user, usernames)
+    return JsonResponse({key: changed, 'missing': missing})
+
+
+@login_required
+@require_POST
+def profile_follow_bulk(request):
+    return bulk_follow_response(request, follow_many, 'followed')
+
+
+@login_required
+@require_POST
+def profile_unfollow_bulk(request):
+    return bulk_follow_response(request, unfollow_many, 'unfollowed')
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,7 +23,11 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'bu$5kj1m%j$n4dy_i9lpu^wxs67pix_26f8x&r!zr+4jv959p1'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = False
+DEBUG = os.getenv('DJANGO_DEBUG', '').lower() in ('1', 'true', 'yes')
+# debug_toolbar и его middleware подключаются только в разработке
+DEBUG_TOOLBAR = os.getenv('DEBUG_TOOLBAR', str(DEBUG)).lower() in (
+    '1', 'true', 'yes'
+)
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 ALLOWED_HOSTS = [
@@ -39,27 +44,40 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
-    'django.contrib.admin',
+    'api.apps.ApiConfig',
+    # admin.py приложений импортирует yatube.urls, а не django.setup()
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.ProfilerMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',
 ]
 
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('core.middleware.ProfilerMiddleware'),
+        'debug_toolbar.middleware.DebugToolbarMiddleware',
+    )
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -67,12 +85,22 @@ INTERNAL_IPS = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# core.loaders сжимает пробелы в HTML-шаблонах проекта при компиляции
+TEMPLATE_MINIFY = True
+TEMPLATE_MINIFY_LOADERS = [
+    'core.loaders.FilesystemLoader',
+    'core.loaders.AppDirectoriesLoader',
+]
+if not DEBUG:
+    TEMPLATE_MINIFY_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_MINIFY_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_MINIFY_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -86,6 +114,24 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Прогрев шаблонов, URLconf, переводов и валидаторов при старте воркера
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', '1').lower() in (
+    '1', 'true', 'yes'
+)
+
+# core.asgi: размер пула потоков для view и что отдавать из цикла событий
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+ASGI_SERVE_CACHED = True
+ASGI_ROUTES = [
+    ('/events/', 'posts.events.stream'),
+]
+
+# Server-Sent Events о новых постах (только через yatube.asgi):
+# /events/index/, /events/group/<slug>/, /events/follow/
+SSE_URL = '/events/'
+SSE_QUEUE_SIZE = 100
+SSE_KEEPALIVE = 15
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -94,9 +140,50 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
     }
 }
 
+# PRAGMA, которые core.signals выполняет на каждом новом соединении SQLite.
+# production: WAL позволяет читать во время записи, а busy_timeout
+# заставляет писателей ждать блокировку вместо "database is locked".
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'production')
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]
+
+# Реплики для чтения. Локально реплика - копия db.sqlite3, которую
+# обновляет manage.py sync_replica; отставание - manage.py replica_lag.
+REPLICA_DATABASES = []
+if os.getenv('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DATABASE_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES = ['replica']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_READ_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:follow_index',
+)
+# Приложения, чьи модели можно читать с реплики; sessions, auth и
+# contenttypes всегда читаются из default
+REPLICA_APPS = ('posts',)
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'db_pin'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/
@@ -117,12 +204,84 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Сессии и пользователь сессии читаются из общего для процессов кэша
+# shared, с записью в БД: выход и смена пароля видны всем воркерам сразу
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+USER_CACHE_ALIAS = 'shared'
+USER_CACHE_TIMEOUT = 300
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.LocMemCache',
+    },
+    # Файлы в общем каталоге видят все процессы на машине; для
+    # нескольких машин - Redis или Memcached
+    'shared': {
+        'BACKEND': 'core.cache.FileBasedCache',
+        'LOCATION': os.getenv('SHARED_CACHE_DIR', os.path.join(
+            tempfile.gettempdir(), 'yatube-cache'
+        )),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # posts.lookups: промахи по URL, отдельно от страниц и сессий
+    'negative': {
+        'BACKEND': 'core.cache.LocMemCache',
+        'LOCATION': 'negative',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+# posts.lookups: сколько секунд помнить, что пользователя, группы или
+# поста из URL нет, и сколько хранить найденные группу или пользователя.
+# Промахи - в кэше процесса, поэтому срок короткий: созданный в другом
+# воркере объект здесь считается ненайденным не дольше него
+NEGATIVE_CACHE_TIMEOUT = 10
+NEGATIVE_CACHE_ALIAS = 'negative'
+LOOKUP_CACHE_TIMEOUT = 300
+# Найденные объекты - в общем кэше, чтобы переименование видели все воркеры
+LOOKUP_CACHE_ALIAS = 'shared'
+# posts.following: id авторов, на которых подписан пользователь; кэш общий,
+# иначе другие воркеры не увидят подписку до истечения срока
+FOLLOWING_CACHE_ALIAS = 'shared'
+FOLLOWING_CACHE_TIMEOUT = 3600
+# posts.recommendations: сколько авторов хранить в «Кого почитать»
+RECOMMENDATIONS_TOP_K = 5
+# Сколько подписчиков или авторов группы пересчитывать на одно изменение
+RECOMMENDATIONS_FANOUT_LIMIT = 1000
+# Очередь пересчёта рекомендаций разбирает manage.py refresh_recommendations
+# --loop или, если включено, фоновый поток каждого процесса
+RECOMMENDATIONS_WORKER_THREAD = os.getenv(
+    'RECOMMENDATIONS_WORKER_THREAD', ''
+).lower() in ('1', 'true', 'yes')
+RECOMMENDATIONS_QUEUE_BATCH_SIZE = 100
+RECOMMENDATIONS_POLL_INTERVAL = 5
+# posts.graph: через сколько секунд граф подписок перечитывается из БД,
+# чтобы увидеть подписки из других процессов; None - никогда
+FOLLOW_GRAPH_MAX_AGE = 300
+# Сколько имён принимает один запрос массовой подписки или отписки
+BULK_FOLLOW_LIMIT = 1000
+# JSON API (api): размер страницы по умолчанию и наибольший ?limit=
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+# /api/v1/posts/batch/: сколько id в одном запросе и сколько секунд
+# хранить посты в кэше
+API_BATCH_MAX_IDS = 100
+API_BATCH_CACHE_TIMEOUT = 60
+# Кэш постов для batch: при нескольких воркерах - общий, иначе правки
+# видны в других процессах только через API_BATCH_CACHE_TIMEOUT
+API_BATCH_CACHE_ALIAS = 'default'
+
+# Сжатие ответов (core.compression): сжатые тела страниц с max-age
+# хранятся в кэше COMPRESS_CACHE_ALIAS, ответы короче MIN_SIZE не сжимаются
+COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', '1').lower() in (
+    '1', 'true', 'yes'
+)
+COMPRESS_MIN_SIZE = 512
+COMPRESS_LEVEL = 6
+COMPRESS_CACHE_ALIAS = 'default'
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
@@ -137,8 +296,16 @@ USE_L10N = True
 USE_TZ = True
 
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# письма ставятся в очередь core.mail, а отправляются через
+# EMAIL_QUEUE_BACKEND (подключаем движок filebased.EmailBackend)
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_QUEUE_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_QUEUE_WORKER_THREAD = True
+EMAIL_QUEUE_BATCH_SIZE = 50
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_RETRY_DELAY = 30
+EMAIL_QUEUE_LEASE = 300
+EMAIL_QUEUE_POLL_INTERVAL = 5
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -149,10 +316,71 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# collectstatic: хэш в именах файлов, сжатые копии .gz/.br и, при
+# STATIC_PURGE_CSS, удаление неиспользуемых правил из STATIC_PURGE_CSS_FILES.
+# Классы, которые появляются только из JS или данных, - в SAFELIST.
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_COMPRESS_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.txt')
+STATIC_PURGE_CSS = os.getenv('STATIC_PURGE_CSS', '').lower() in (
+    '1', 'true', 'yes'
+)
+STATIC_PURGE_CSS_FILES = ('css/bootstrap.min.css',)
+STATIC_PURGE_CSS_SAFELIST = ('active', 'collapsing', 'disabled', 'show')
+# Отдавать статику из процесса (yatube.wsgi, core.asgi)
+SERVE_STATIC = True
+# Сколько байт статики со сжатыми вариантами держать в памяти процесса
+STATIC_MEMORY_LIMIT = 32 * 1024 ** 2
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Лимиты запросов по имени URL: token bucket на пользователя и/или IP,
+# 'N/s|m|h|d'; methods - какие методы ограничивать (по умолчанию все)
+RATE_LIMITS = {
+    'posts:post_create': {'methods': ('POST',), 'user': '10/m', 'ip': '30/m'},
+    'posts:add_comment': {'methods': ('POST',), 'user': '20/m', 'ip': '60/m'},
+    'posts:profile_follow': {'user': '30/m', 'ip': '120/m'},
+    # Один запрос подписывает на BULK_FOLLOW_LIMIT авторов
+    'posts:profile_follow_bulk': {
+        'methods': ('POST',), 'user': '2/m', 'ip': '10/m',
+    },
+    'posts:profile_unfollow_bulk': {
+        'methods': ('POST',), 'user': '2/m', 'ip': '10/m',
+    },
+    'users:login': {'methods': ('POST',), 'ip': '10/m'},
+}
+
+# Семплирующий профайлер view (core:sampling_profile), только для staff
+SAMPLING_PROFILER_ENABLED = os.getenv(
+    'SAMPLING_PROFILER_ENABLED', ''
+).lower() in ('1', 'true', 'yes')
+SAMPLING_PROFILER_NAMESPACES = ('posts',)
+SAMPLING_PROFILER_INTERVAL = 0.005
+SAMPLING_PROFILER_MAX_SECONDS = 60
+# kill -USR2 <pid> снимает профиль за SIGNAL_SECONDS и пишет его в DUMP_DIR
+SAMPLING_PROFILER_SIGNAL = 'SIGUSR2'
+SAMPLING_PROFILER_SIGNAL_SECONDS = 10
+SAMPLING_PROFILER_DUMP_DIR = tempfile.gettempdir()
+
+# Журнал медленных SQL-запросов (core:slow_queries), порог в секундах
+SLOW_QUERY_LOG_ENABLED = os.getenv(
+    'SLOW_QUERY_LOG_ENABLED', ''
+).lower() in ('1', 'true', 'yes')
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.1))
+SLOW_QUERY_LOG_SIZE = 200
+
+# Метрики Prometheus (core:metrics). Для pre-fork серверов задайте
+# METRICS_MULTIPROCESS_DIR, общий для всех воркеров каталог.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '').lower() in (
+    '1', 'true', 'yes'
+)
+METRICS_MULTIPROCESS_DIR = os.getenv('METRICS_MULTIPROCESS_DIR', '')
+METRICS_FLUSH_INTERVAL = 1.0
+
+THUMBNAIL_BACKEND = 'core.thumbnails.MetricsThumbnailBackend'
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
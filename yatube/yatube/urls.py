@@ -19,6 +19,8 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+# SimpleAdminConfig не ищет admin.py при старте, регистрируем модели здесь
+admin.autodiscover()
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -26,6 +28,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/', include('api.urls', namespace='api')),
+    path('', include('core.urls', namespace='core')),
 
 ]
 
@@ -44,8 +48,10 @@ handler510 = 'core.views.not_extended'
 handler511 = 'core.views.network_authentication_required'
 
 if settings.DEBUG:
-    import debug_toolbar
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
+
+if settings.DEBUG_TOOLBAR:
+    import debug_toolbar
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
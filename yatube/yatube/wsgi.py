@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.SERVE_STATIC:
+    from core.staticfiles import StaticFilesWSGI
+    application = StaticFilesWSGI(application)
+
+if settings.WARMUP_ON_START:
+    from core.warmup import warm_up
+    warm_up()